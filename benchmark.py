@@ -0,0 +1,356 @@
+import sys
+import getopt
+import os
+import json
+import time
+import shutil
+import tempfile
+import subprocess
+import numpy
+import pngstream
+import bezeldetect
+import bezelwriters
+import mamesets
+from os.path import join, exists, getsize
+try:
+	import resource
+except ImportError:
+	resource = None
+
+scriptPath = os.path.dirname(os.path.abspath(__file__))
+# Bezel sizes that can be generated
+sizes = {'1080': (1920, 1080), '4k': (3840, 2160), '8k': (7680, 4320)}
+# single = one 4:3 hole, ds = two holes stacked like a Nintendo DS, none = no transparency, rounded = one hole with rounded, soft corners
+kinds = ['single', 'ds', 'none', 'rounded']
+
+def holeBoxes(width, height, kind):
+	# (left, top, right, bottom) of each transparent hole
+	if kind == 'none':
+		return []
+	if kind == 'ds':
+		screenHeight = height * 9 // 20
+		screenWidth = screenHeight * 4 // 3
+		gap = height // 40
+		left = (width - screenWidth) // 2
+		top = (height - 2 * screenHeight - gap) // 2
+		return [(left, top, left + screenWidth, top + screenHeight), (left, top + screenHeight + gap, left + screenWidth, top + 2 * screenHeight + gap)]
+	screenHeight = height * 7 // 8
+	screenWidth = screenHeight * 4 // 3
+	left = (width - screenWidth) // 2
+	top = (height - screenHeight) // 2
+	return [(left, top, left + screenWidth, top + screenHeight)]
+
+def writeBezel(fileName, width, height, kind, filterType='adaptive'):
+	# RGBA png written a row at a time, so even 8K bezels don't need the whole image in memory
+	# filterType is one of pngstream.filterTypes, real bezels from ImageMagick use adaptive filtering
+	boxes = holeBoxes(width, height, kind)
+	radius = height // 24 if kind == 'rounded' else 0
+	columns = numpy.arange(width, dtype=numpy.uint32)
+	pixels = numpy.empty((width, 4), dtype=numpy.uint8)
+	pixels[:, 0] = columns * 255 // max(1, width - 1)
+	with pngstream.PngWriter(fileName, width, height, colorType=6, filterType=filterType) as bezel:
+		for row in range(height):
+			pixels[:, 1] = row * 255 // max(1, height - 1)
+			pixels[:, 2] = (columns ^ row) & 255
+			pixels[:, 3] = 255
+			for left, top, right, bottom in boxes:
+				if row < top or row >= bottom:
+					continue
+				inset = 0
+				if radius > 0:
+					if row < top + radius:
+						distance = top + radius - row - 0.5
+					elif row >= bottom - radius:
+						distance = row - (bottom - radius) + 0.5
+					else:
+						distance = 0
+					inset = int(round(radius - (radius * radius - distance * distance) ** 0.5))
+				pixels[left + inset:right - inset, 3] = 0
+				if radius > 0:
+					# Antialiased edge, the threshold has to decide which side these go on
+					pixels[left + inset - 1, 3] = 128
+					pixels[right - inset, 3] = 128
+			bezel.writeRow(pixels.tobytes())
+
+def writeMameXml(fileName, parentCount, cloneCount, prefix='bench'):
+	# Looks enough like mame -listxml to time parsing: every machine has the usual tags, clones are spread over the parents
+	# Returns the parent set names, in XML order
+	parents = ['{}{:05d}'.format(prefix, i) for i in range(parentCount)]
+	with open(fileName, 'w') as xmlFile:
+		xmlFile.write('<?xml version="1.0"?>\n<mame build="benchmark" debug="no" mameconfig="10">\n')
+		for i, parent in enumerate(parents):
+			machines = [(parent, '')]
+			clones = cloneCount // parentCount + (1 if i < cloneCount % parentCount else 0)
+			machines.extend(('{}c{:02d}'.format(parent, clone), parent) for clone in range(clones))
+			for machineName, machineParent in machines:
+				if machineParent == '':
+					xmlFile.write('\t<machine name="{}" sourcefile="bench.cpp">\n'.format(machineName))
+				else:
+					xmlFile.write('\t<machine name="{0}" sourcefile="bench.cpp" cloneof="{1}" romof="{1}">\n'.format(machineName, machineParent))
+				xmlFile.write('\t\t<description>Benchmark machine {}</description>\n\t\t<year>1985</year>\n\t\t<manufacturer>Bezel Tools</manufacturer>\n'.format(machineName))
+				for rom in range(8):
+					xmlFile.write('\t\t<rom name="{0}.{1}" size="16384" crc="{1:08x}" sha1="{2}" region="maincpu" offset="{3:x}"/>\n'.format(machineName, rom, '0' * 40, rom * 16384))
+				xmlFile.write('\t\t<chip type="cpu" tag="maincpu" name="Z80" clock="3072000"/>\n')
+				xmlFile.write('\t\t<display tag="screen" type="raster" rotate="0" width="288" height="224" refresh="60.000000"/>\n')
+				xmlFile.write('\t\t<driver status="good" emulation="good" savestate="supported"/>\n\t</machine>\n')
+		xmlFile.write('</mame>\n')
+	return parents
+
+def peakMegabytes(maxRss):
+	# ru_maxrss is in kilobytes on Linux, bytes on macOS
+	if sys.platform == 'darwin':
+		return maxRss / (1024 * 1024)
+	return maxRss / 1024
+
+# Runs a script and saves its peak RSS to the file named in BEZELBENCH_PEAK when it exits
+# On Linux a child's ru_maxrss starts at its parent's, so the script's own VmHWM is used there, workers are covered by RUSAGE_CHILDREN
+peakWrapper = """
+import os, sys, json, atexit, runpy
+
+def savePeak():
+	peak = None
+	try:
+		with open('/proc/self/status') as status:
+			for line in status:
+				if line.startswith('VmHWM:'):
+					peak = int(line.split()[1]) / 1024
+	except OSError:
+		pass
+	try:
+		import resource
+	except ImportError:
+		resource = None
+	if resource is not None:
+		usage = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+		if peak is None:
+			usage = max(usage, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+		peak = max(peak or 0, usage / (1024 * 1024 if sys.platform == 'darwin' else 1024))
+	with open(os.environ['BEZELBENCH_PEAK'], 'w') as peakFile:
+		json.dump(peak, peakFile)
+
+atexit.register(savePeak)
+sys.argv = sys.argv[1:]
+sys.path.insert(0, os.path.dirname(sys.argv[0]))
+runpy.run_path(sys.argv[0], run_name='__main__')
+"""
+
+def runScript(script, args, workPath):
+	# Runs one of the scripts in its own process, returns (seconds, peak RSS in MB or None, return code)
+	# Output goes to a log file in the work folder so a chatty script can't fill a pipe
+	logName = join(workPath, os.path.splitext(script)[0] + '.log')
+	peakName = join(workPath, 'peak.json')
+	environment = dict(os.environ, BEZELBENCH_PEAK=peakName)
+	with open(logName, 'a') as log:
+		log.write('\n$ {} {}\n'.format(script, ' '.join(args)))
+		log.flush()
+		start = time.perf_counter()
+		returnCode = subprocess.call([sys.executable, '-c', peakWrapper, join(scriptPath, script)] + args, cwd=workPath, env=environment, stdout=log, stderr=subprocess.STDOUT, stdin=subprocess.DEVNULL)
+		seconds = time.perf_counter() - start
+	peak = None
+	if exists(peakName):
+		with open(peakName, 'r') as peakFile:
+			peak = json.load(peakFile)
+		os.remove(peakName)
+	if returnCode != 0:
+		print('{} failed with code {}, see {}'.format(script, returnCode, logName))
+	return seconds, peak, returnCode
+
+def timeStage(stages, name, function, *args, size=0, count=1):
+	# Runs function once, adding its time and the work done to stages[name]
+	start = time.perf_counter()
+	result = function(*args)
+	stage = stages.setdefault(name, {'seconds': 0.0, 'bytes': 0, 'items': 0})
+	stage['seconds'] += time.perf_counter() - start
+	stage['bytes'] += size
+	stage['items'] += count
+	return result
+
+def stageBenchmark(bezelPath, pngList, xmlFile, stages):
+	# Times each step of the work in this process, one png at a time
+	for f in pngList:
+		fileName = join(bezelPath, f)
+		size = getsize(fileName)
+		setName = os.path.splitext(f)[0]
+		width, height, alpha = timeStage(stages, 'png decode', bezeldetect.readAlpha, fileName, size=size)
+		mask = timeStage(stages, 'threshold', bezeldetect.alphaMask, alpha, size=alpha.size)
+		areas = timeStage(stages, 'label areas', bezeldetect.findAreas, mask, size=mask.size)
+		timeStage(stages, 'coarse areas', bezeldetect.findAreasCoarse, mask, size=mask.size)
+		timeStage(stages, 'inscribed fit', bezeldetect.inscribedAreas, mask, areas, size=mask.size)
+		del alpha, mask
+		timeStage(stages, 'streamed detection', bezeldetect.detectStream, fileName, size=size)
+		if len(areas) > 0:
+			layText = bezelwriters.layoutText(setName, width, height, areas[0])
+			timeStage(stages, 'write info', bezelwriters.writeInfo, bezelPath, setName, width, height, areas[0], 0.7)
+			timeStage(stages, 'write zip', bezelwriters.writeArtZip, bezelPath, setName, layText, size=size)
+	size = getsize(xmlFile)
+	mameSets = mamesets.MameSets()
+
+	def readXml():
+		for machineName, machineParent in mamesets.readMachines(xmlFile):
+			mameSets.add(machineName, machineParent)
+	timeStage(stages, 'xml parse', readXml, size=size)
+	timeStage(stages, 'cache save', mamesets.saveCache, xmlFile, mameSets, '')
+	timeStage(stages, 'cache load', mamesets.loadCache, xmlFile, size=getsize(mamesets.cacheFile(xmlFile)))
+
+def printStages(stages):
+	print('\n{:<22}{:>10}{:>8}{:>12}{:>12}'.format('Stage', 'Seconds', 'Items', 'Items/s', 'MB/s'))
+	for name, stage in stages.items():
+		seconds = max(stage['seconds'], 1e-9)
+		perSecond = '{:.1f}'.format(stage['bytes'] / seconds / (1024 * 1024)) if stage['bytes'] > 0 else '-'
+		print('{:<22}{:>10.3f}{:>8}{:>12.1f}{:>12}'.format(name, stage['seconds'], stage['items'], stage['items'] / seconds, perSecond))
+
+def main(argv):
+	# Settings
+	workPath = None
+	keepFiles = False
+	sizeList = list(sizes)
+	bezelCount = 1
+	parentCount = 20000
+	cloneCount = 30000
+	jobs = 1
+	runStages = True
+	runScripts = True
+	jsonFile = None
+	filterType = 'adaptive'
+
+	# Command Line options
+	try:
+		opts, args = getopt.getopt(argv, '?o:ks:n:j:', ['help', 'output=', 'keep', 'sizes=', 'count=', 'parents=', 'clones=', 'jobs=', 'no-stages', 'no-scripts', 'json=', 'filter='])
+	except getopt.GetoptError:
+		print('Invalid command line option. Use -? or --help to see available options.')
+		sys.exit()
+	for opt, arg in opts:
+		if opt in ['-o', '--output']:
+			workPath = os.path.abspath(arg)
+		elif opt in ['-k', '--keep']:
+			keepFiles = True
+		elif opt in ['-s', '--sizes']:
+			sizeList = [size.strip().lower() for size in arg.split(',') if size.strip() != '']
+			unknown = [size for size in sizeList if size not in sizes]
+			if len(unknown) > 0 or len(sizeList) == 0:
+				print('Sizes must be any of {} separated by commas.'.format(','.join(sizes)))
+				sys.exit()
+		elif opt in ['-n', '--count', '--parents', '--clones', '-j', '--jobs']:
+			try:
+				value = int(arg)
+			except ValueError:
+				value = -1
+			if value < 0 or (value == 0 and opt in ['-n', '--count', '--parents']):
+				print('{} must be a whole number.'.format(opt))
+				sys.exit()
+			if opt in ['-n', '--count']:
+				bezelCount = value
+			elif opt == '--parents':
+				parentCount = value
+			elif opt == '--clones':
+				cloneCount = value
+			else:
+				jobs = value
+		elif opt == '--no-stages':
+			runStages = False
+		elif opt == '--no-scripts':
+			runScripts = False
+		elif opt == '--json':
+			jsonFile = os.path.abspath(arg)
+		elif opt == '--filter':
+			filterType = arg.strip().lower()
+			if filterType not in pngstream.filterTypes:
+				print('Filter must be one of {}.'.format(', '.join(pngstream.filterTypes)))
+				sys.exit()
+		elif opt in ['-?', '--help']:
+			print('Available command line options:')
+			print('-?; --help:                   Shows this information')
+			print('-o [folder]; --output [folder]: Folder to generate the test files in (under a bezelbench subfolder), the default is a temporary folder')
+			print('-k; --keep:                   Keep the generated files afterwards')
+			print('-s [list]; --sizes [list]:    Bezel sizes to generate, any of {} separated by commas. The default is all of them'.format(','.join(sizes)))
+			print('-n [count]; --count [count]:  Bezels of each kind ({}) to generate for each size. The default is 1'.format(', '.join(kinds)))
+			print('--parents [count]:            Parent sets in the generated mame.xml, the default is 20000')
+			print('--clones [count]:             Clone sets in the generated mame.xml, the default is 30000')
+			print('-j [count]; --jobs [count]:   Passed on to createinfos.py and createmameart.py')
+			print('--no-stages:                  Skip the per-stage timings')
+			print('--no-scripts:                 Skip running the scripts end to end')
+			print('--json [file]:                Also save the results to a JSON file, to compare against later runs')
+			print('--filter [type]:              png row filter for the generated bezels, one of {}. The default is adaptive, like ImageMagick'.format(', '.join(pngstream.filterTypes)))
+			sys.exit()
+
+	if workPath is None:
+		workPath = tempfile.mkdtemp(prefix='bezelbench')
+	else:
+		# Everything goes in a folder of its own, so removing it afterwards can't touch anything else
+		workPath = join(workPath, 'bezelbench')
+		if exists(workPath):
+			print('{} already exists, remove it or use another folder.'.format(workPath))
+			sys.exit()
+		os.makedirs(workPath)
+	bezelPath = join(workPath, 'bezels')
+	sourcePath = join(workPath, 'source')
+	xmlFile = join(workPath, 'mame.xml')
+	os.makedirs(sourcePath, exist_ok=True)
+	results = {'sizes': sizeList, 'count': bezelCount, 'parents': parentCount, 'clones': cloneCount, 'jobs': jobs, 'filter': filterType, 'generate': {}, 'stages': {}, 'scripts': {}}
+
+	# Generate the test files, bezels are named after the first parent sets so mameclonebezels.py has clones to copy
+	print('Generating mame.xml with {} parent and {} clone sets...'.format(parentCount, cloneCount))
+	start = time.perf_counter()
+	parents = writeMameXml(xmlFile, parentCount, cloneCount)
+	results['generate']['xml'] = {'seconds': time.perf_counter() - start, 'bytes': getsize(xmlFile)}
+	pngList = []
+	start = time.perf_counter()
+	for size in sizeList:
+		width, height = sizes[size]
+		for kind in kinds:
+			for i in range(bezelCount):
+				setName = parents[len(pngList) % len(parents)]
+				print('Generating {} ({} {}x{})...'.format(setName + '.png', kind, width, height))
+				writeBezel(join(sourcePath, setName + '.png'), width, height, kind, filterType)
+				pngList.append(setName + '.png')
+	pngBytes = sum(getsize(join(sourcePath, f)) for f in pngList)
+	results['generate']['png'] = {'seconds': time.perf_counter() - start, 'files': len(pngList), 'bytes': pngBytes}
+
+	if runStages:
+		print('\nTiming each stage...')
+		stagePath = join(workPath, 'stages')
+		shutil.copytree(sourcePath, stagePath)
+		stageXml = join(stagePath, 'mame.xml')
+		shutil.copy2(xmlFile, stageXml)
+		stageBenchmark(stagePath, pngList, stageXml, results['stages'])
+		printStages(results['stages'])
+		if resource is not None:
+			results['benchmarkPeakMB'] = peakMegabytes(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+	if runScripts:
+		print('\nRunning the scripts...')
+		shutil.copytree(sourcePath, bezelPath)
+		jobArgs = ['-j', str(jobs)] if jobs != 1 else []
+		clonePath = join(workPath, 'clones')
+		# The first clone run reads the XML and writes its cache, the second one loads the cache
+		runs = [
+			('createinfos.py', ['-p', bezelPath] + jobArgs, len(pngList), pngBytes),
+			('createmameart.py', ['-p', bezelPath] + jobArgs, len(pngList), pngBytes),
+			('mameclonebezels.py (xml)', ['-p', clonePath, '-x', xmlFile, '-r'], parentCount + cloneCount, getsize(xmlFile)),
+			('mameclonebezels.py (cache)', ['-p', clonePath, '-x', xmlFile], parentCount + cloneCount, getsize(xmlFile)),
+		]
+		for name, scriptArgs, items, size in runs:
+			if clonePath in scriptArgs:
+				# Clone runs copy files, give each one the same starting folder
+				shutil.copytree(bezelPath, clonePath)
+			seconds, peak, code = runScript(name.split(' ')[0], scriptArgs, workPath)
+			results['scripts'][name] = {'seconds': seconds, 'peakMB': peak, 'items': items, 'bytes': size, 'code': code}
+			if clonePath in scriptArgs:
+				shutil.rmtree(clonePath)
+		print('\n{:<28}{:>10}{:>12}{:>10}{:>10}'.format('Script', 'Seconds', 'Items/s', 'MB/s', 'Peak MB'))
+		for name, run in results['scripts'].items():
+			seconds = max(run['seconds'], 1e-9)
+			peak = '{:.0f}'.format(run['peakMB']) if run['peakMB'] is not None else 'n/a'
+			print('{:<28}{:>10.2f}{:>12.1f}{:>10.1f}{:>10}'.format(name, run['seconds'], run['items'] / seconds, run['bytes'] / seconds / (1024 * 1024), peak))
+
+	if jsonFile is not None:
+		with open(jsonFile, 'w') as report:
+			json.dump(results, report, indent=1)
+		print('\nResults saved to {}'.format(jsonFile))
+	if keepFiles:
+		print('Test files kept in {}'.format(workPath))
+	else:
+		shutil.rmtree(workPath)
+
+if __name__ == "__main__":
+   main(sys.argv[1:])
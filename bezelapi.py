@@ -0,0 +1,148 @@
+import os
+import functools
+import collections
+from os.path import join, splitext, basename, dirname
+from concurrent.futures import ProcessPoolExecutor
+import bezeldetect
+import bezelwriters
+
+# Opacity written to .info files, the same default as the scripts
+defaultOpacity = 0.7
+
+class Viewport:
+	# Detection result for one bezel: its set name, the png file it came from (None for a png given as bytes), the image
+	# size, and every transparent area as (left, top, width, height). The first area is the viewport, a bezel with no
+	# areas or more than one (a DS bezel) needs checking by hand. verified is only set by detection with verify=True
+	# With fit='inscribed' the areas are the largest rectangles inside the transparent areas, and boxes their bounding boxes
+	__slots__ = ['name', 'source', 'width', 'height', 'areas', 'verified', 'boxes']
+
+	def __init__(self, name, source, width, height, areas, verified=None, boxes=None):
+		self.name = name
+		self.source = source
+		self.width = width
+		self.height = height
+		self.areas = areas
+		self.verified = verified
+		self.boxes = boxes
+
+	def __repr__(self):
+		return 'Viewport({!r}, {}x{}, areas={})'.format(self.name, self.width, self.height, self.areas)
+
+	@property
+	def area(self):
+		# The viewport, None if no transparent area was found
+		if len(self.areas) == 0:
+			return None
+		return self.areas[0]
+
+	# The text of each output, None if there is no viewport to write, the same as the writers below
+
+	def infoText(self, opacity=defaultOpacity):
+		if self.area is None:
+			return None
+		return bezelwriters.infoText(self.width, self.height, self.area, opacity)
+
+	def layoutText(self):
+		if self.area is None:
+			return None
+		return bezelwriters.layoutText(self.name, self.width, self.height, self.area)
+
+def isBytes(image):
+	return isinstance(image, (bytes, bytearray, memoryview))
+
+def detect(image, name=None, debugName=None, scale=0, verify=False, stream=False, fit='box'):
+	# Finds the viewport of one png, given as a file name or as the png itself in bytes
+	# name is the set name the writers use, it defaults to the file name without .png and is needed for bytes
+	# scale, verify, stream and fit are the same as --coarse, --verify, --stream and --fit, debugName as for bezeldetect.detectFile
+	if isBytes(image):
+		if name is None:
+			raise ValueError('A name is needed for a png given as bytes')
+		source = None
+	else:
+		image = os.fspath(image)
+		source = image
+		if name is None:
+			name = splitext(basename(image))[0]
+	width, height, areas, verified, boxes = bezeldetect.detectFile(image, debugName, scale, verify, stream, fit)
+	return Viewport(name, source, width, height, areas, verified, boxes)
+
+def detectItem(item, debugFolder, options):
+	# One item for detectMany: a file name, or a (name, png bytes) pair. Runs in the worker process
+	if isinstance(item, tuple):
+		name, image = item
+	else:
+		image = os.fspath(item)
+		name = splitext(basename(image))[0]
+	debugName = None
+	if debugFolder is not None:
+		debugName = join(debugFolder, name + '.png')
+	return detect(image, name, debugName, **options)
+
+def detectMany(images, jobs=1, executor=None, debugFolder=None, **options):
+	# Yields a Viewport for each item of images, in order. Items are file names or (name, png bytes) pairs, and images
+	# can be any iterable, including a generator: only a few items past the one being yielded are taken from it, so any
+	# number of images can be pipelined without holding them all
+	# jobs > 1 detects in a pool of that many processes. To share a pool you already have, pass it as executor, jobs then
+	# sets how many items it is given at once
+	# Masks of bezels without exactly one area are saved to debugFolder if it is set, other options are as for detect
+	detectOne = functools.partial(detectItem, debugFolder=debugFolder, options=options)
+	if executor is None and jobs <= 1:
+		for item in images:
+			yield detectOne(item)
+		return
+	ownPool = executor is None
+	if ownPool:
+		executor = ProcessPoolExecutor(max_workers=jobs)
+	# Keep each worker busy with one item while another waits, without reading ahead any further
+	pending = collections.deque()
+	try:
+		for item in images:
+			pending.append(executor.submit(detectOne, item))
+			if len(pending) > 2 * max(jobs, 1):
+				yield pending.popleft().result()
+		while len(pending) > 0:
+			yield pending.popleft().result()
+	finally:
+		# Only reached early if the caller stops reading or an error is raised
+		for future in pending:
+			future.cancel()
+		if ownPool:
+			executor.shutdown()
+
+def outputFolder(viewport, folder):
+	# Outputs go next to the png unless another folder is given
+	if folder is not None:
+		return folder
+	if viewport.source is None:
+		raise ValueError('A folder is needed for {}, it was detected from bytes'.format(viewport.name))
+	return dirname(os.path.abspath(viewport.source))
+
+# Writers return the file they wrote, or None if the bezel has no viewport so nothing was written
+
+def writeInfo(viewport, folder=None, opacity=defaultOpacity):
+	if viewport.area is None:
+		return None
+	folder = outputFolder(viewport, folder)
+	bezelwriters.writeInfo(folder, viewport.name, viewport.width, viewport.height, viewport.area, opacity)
+	return join(folder, viewport.name + '.info')
+
+def writeLayout(viewport, folder=None):
+	if viewport.area is None:
+		return None
+	folder = outputFolder(viewport, folder)
+	bezelwriters.writeLayout(folder, viewport.name, viewport.layoutText())
+	return join(folder, viewport.name + '.lay')
+
+def writeArtZip(viewport, folder=None, pngData=None):
+	# The png goes in the zip from pngData if it is given, otherwise from the file the viewport was detected from
+	if viewport.area is None:
+		return None
+	folder = outputFolder(viewport, folder)
+	if pngData is None:
+		if viewport.source is None:
+			raise ValueError('pngData is needed for {}, it was detected from bytes'.format(viewport.name))
+		if os.path.abspath(viewport.source) != os.path.abspath(join(folder, viewport.name + '.png')):
+			with open(viewport.source, 'rb') as pngFile:
+				pngData = pngFile.read()
+	bezelwriters.writeArtZip(folder, viewport.name, viewport.layoutText(), pngData)
+	return join(folder, viewport.name + '.zip')
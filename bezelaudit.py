@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import zlib
+import struct
+import zipfile
+from os.path import join, splitext, basename, exists, getsize
+from xml.etree import ElementTree
+import pngstream
+
+# Outputs a png can have next to it, an output without its png is reported
+outputExtensions = ['.info', '.lay', '.zip']
+# Zip times are only kept to 2 seconds
+zipTimeResolution = 2
+
+def checkArea(area, width, height):
+	# Problem with a (left, top, width, height) viewport in a width x height bezel, or None if it fits
+	left, top, areaWidth, areaHeight = area
+	if areaWidth <= 0 or areaHeight <= 0:
+		return 'viewport is empty'
+	if left < 0 or top < 0 or left + areaWidth > width or top + areaHeight > height:
+		return 'viewport {:g}x{:g} at {:g},{:g} is outside the {}x{} image'.format(areaWidth, areaHeight, left, top, width, height)
+	return None
+
+def infoProblems(infoFile, width, height):
+	try:
+		with open(infoFile, 'r') as infoData:
+			info = json.load(infoData)
+		infoWidth, infoHeight = int(info['width']), int(info['height'])
+		left, top = int(info['left']), int(info['top'])
+		right, bottom = int(info['right']), int(info['bottom'])
+	except (OSError, ValueError, KeyError, TypeError):
+		return ['.info could not be read']
+	problems = []
+	if (infoWidth, infoHeight) != (width, height):
+		problems.append('.info is for a {}x{} image, the png is {}x{}'.format(infoWidth, infoHeight, width, height))
+	areaProblem = checkArea((left, top, width - left - right, height - top - bottom), width, height)
+	if areaProblem is not None:
+		problems.append('.info ' + areaProblem)
+	return problems
+
+def boundsOf(element):
+	# (x, y, width, height) of a <bounds>, which MAME also allows as left/top/right/bottom
+	if element is None:
+		return None
+	if 'left' in element.attrib or 'right' in element.attrib:
+		left = float(element.get('left', 0))
+		top = float(element.get('top', 0))
+		return left, top, float(element.get('right', 1)) - left, float(element.get('bottom', 1)) - top
+	return float(element.get('x', 0)), float(element.get('y', 0)), float(element.get('width', 1)), float(element.get('height', 1))
+
+def layProblems(layText, width, height, label='.lay'):
+	try:
+		root = ElementTree.fromstring(layText)
+		screen = boundsOf(root.find('.//view/screen/bounds'))
+		bezel = boundsOf(root.find(".//view/element[@ref='bezel']/bounds"))
+	except (ElementTree.ParseError, ValueError):
+		return [label + ' could not be read']
+	if screen is None:
+		return [label + ' has no screen']
+	problems = []
+	if bezel is not None and (bezel[2], bezel[3]) != (width, height):
+		problems.append('{} is for a {:g}x{:g} image, the png is {}x{}'.format(label, bezel[2], bezel[3], width, height))
+	areaProblem = checkArea(screen, width, height)
+	if areaProblem is not None:
+		problems.append(label + ' ' + areaProblem)
+	return problems
+
+def fileCrc(fileName):
+	# CRC-32 of a file as zip stores it, read in pieces so a large png isn't held at once
+	crc = 0
+	with open(fileName, 'rb') as dataFile:
+		for piece in iter(lambda: dataFile.read(1024 * 1024), b''):
+			crc = zlib.crc32(piece, crc)
+	return crc & 0xffffffff
+
+def zipProblems(zipName, pngName, width, height, checkCrc=False):
+	# The member list is checked without unpacking anything, only the small .lay is read
+	# The png in the zip is compared with the one next to it by size and by date (the zip keeps the png's modified time),
+	# so a png that was exported again at the same size still shows up as stale. checkCrc also compares the CRC the zip
+	# keeps for it, which means reading the whole png
+	setName = splitext(basename(pngName))[0]
+	try:
+		with zipfile.ZipFile(zipName) as mameArtFile:
+			members = {member.filename: member for member in mameArtFile.infolist()}
+			problems = []
+			if setName + '.png' not in members:
+				problems.append('.zip has no {}.png'.format(setName))
+			elif members[setName + '.png'].file_size != getsize(pngName):
+				problems.append('.zip is stale, its png is not the same size as {}.png'.format(setName))
+			elif abs(time.mktime(members[setName + '.png'].date_time + (0, 0, -1)) - os.stat(pngName).st_mtime) > zipTimeResolution:
+				problems.append('.zip is stale, its png is not from the same time as {}.png'.format(setName))
+			elif checkCrc and members[setName + '.png'].CRC != fileCrc(pngName):
+				problems.append('.zip is stale, its png does not match {}.png'.format(setName))
+			if setName + '.lay' not in members:
+				problems.append('.zip has no {}.lay'.format(setName))
+			else:
+				problems += layProblems(mameArtFile.read(setName + '.lay'), width, height, '.lay in .zip')
+	except (OSError, zipfile.BadZipFile):
+		return ['.zip could not be read']
+	return problems
+
+def auditBezel(filePath, f, emit, checkCrc=False):
+	# Problems with png f and its outputs, [] if there are none. emit is the outputs it should have
+	# Only the png's header is read, the image itself is never decoded. With checkCrc, a png with a zip is read in full
+	pngName = join(filePath, f)
+	setPath = join(filePath, splitext(f)[0])
+	try:
+		width, height = pngstream.readHeader(pngName)[:2]
+	except (OSError, ValueError, struct.error):
+		return ['png header could not be read']
+	problems = []
+	if exists(setPath + '.info'):
+		problems += infoProblems(setPath + '.info', width, height)
+	elif 'info' in emit:
+		problems.append('missing .info')
+	if exists(setPath + '.lay'):
+		try:
+			with open(setPath + '.lay', 'rb') as layFile:
+				problems += layProblems(layFile.read(), width, height)
+		except OSError:
+			problems.append('.lay could not be read')
+	elif 'lay' in emit:
+		problems.append('missing .lay')
+	if exists(setPath + '.zip'):
+		problems += zipProblems(setPath + '.zip', pngName, width, height, checkCrc)
+	elif 'zip' in emit and not exists(setPath + '.lay'):
+		# Like --skip, a .lay on its own counts as MAME art being there
+		problems.append('missing .zip')
+	return problems
+
+def orphanOutputs(names):
+	# Outputs in names (paths from the bezel folder) that have no png next to them
+	names = set(names)
+	return sorted(name for name in names if splitext(name)[1].lower() in outputExtensions and splitext(name)[0] + '.png' not in names)
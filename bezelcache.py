@@ -0,0 +1,53 @@
+from os.path import join, exists
+import jsonmanifest
+
+manifestName = 'bezelcache.json'
+# Bump when the layout of the manifest changes
+manifestVersion = 1
+
+class BezelCache(jsonmanifest.FolderManifest):
+	# Manifest kept in the bezel folder: png content hash -> image size and transparent areas
+	# Each png also remembers which hash its outputs (info, lay) were last written from, so edited files get redone
+	def __init__(self, folder):
+		super().__init__(folder, manifestName, manifestVersion)
+		self.results = {}
+		saved = self.load('results')
+		if saved is not None:
+			self.results = saved[0]
+
+	def fileHash(self, name):
+		# Only reads the file if its size or mtime changed since the last run
+		sha1 = super().fileHash(name)
+		self.files[name].setdefault('outputs', {})
+		return sha1
+
+	def isCurrent(self, name, kind):
+		# False if the png changed after its output of this kind was written, True if it didn't or if we never wrote it
+		entry = self.files[name]
+		return entry['outputs'].get(kind, entry['sha1']) == entry['sha1']
+
+	def setOutput(self, name, kind):
+		self.files[name]['outputs'][kind] = self.files[name]['sha1']
+
+	def result(self, sha1):
+		# (width, height, areas, boxes) detected earlier for this content, or None. boxes is only kept for inscribed fits
+		# Results for a fit other than the bounding box are stored under sha1 + ':' + the fit
+		cached = self.results.get(sha1)
+		if cached is None:
+			return None
+		boxes = None
+		if len(cached) > 3:
+			boxes = [tuple(box) for box in cached[3]]
+		return cached[0], cached[1], [tuple(area) for area in cached[2]], boxes
+
+	def store(self, sha1, width, height, areas, boxes=None):
+		self.results[sha1] = [width, height, [list(area) for area in areas]]
+		if boxes is not None:
+			self.results[sha1].append([list(box) for box in boxes])
+
+	def save(self):
+		# Drops pngs that are gone and results no png uses any more
+		self.files = {name: entry for name, entry in self.files.items() if exists(join(self.folder, name))}
+		used = set(entry['sha1'] for entry in self.files.values())
+		self.results = {sha1: cached for sha1, cached in self.results.items() if sha1.split(':')[0] in used}
+		return self.saveData(results=self.results)
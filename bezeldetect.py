@@ -0,0 +1,439 @@
+import os
+import zlib
+import struct
+import ctypes
+import contextlib
+import numpy
+from wand.image import Image, STORAGE_TYPES
+from wand.api import library
+from wand.exceptions import WandException
+import pngstream
+import bezelprofile
+
+# We want a transparent box of at least 320x200.
+minWidth = 320
+minHeight = 200
+# Default shrink factor for coarse detection
+coarseScale = 8
+# How the viewport is fitted to a transparent area: its bounding box, or the largest rectangle that is transparent all over
+fitModes = ['box', 'inscribed']
+# Errors that mean one png couldn't be read (gone, truncated or corrupt), they stop that file without stopping the rest
+readErrors = (OSError, ValueError, zlib.error, struct.error, WandException)
+# StageTimes of the file being detected, only set while profiling
+profile = None
+
+def stage(name, bytesRead=0):
+	# Times a block into the active profile, does nothing if there isn't one
+	if profile is None:
+		return contextlib.nullcontext({'read': 0, 'written': 0})
+	return profile.stage(name, bytesRead)
+
+def sourceSize(source):
+	# Size in bytes of a png given as a file name or as the png bytes themselves
+	if isinstance(source, (bytes, bytearray, memoryview)):
+		return len(source)
+	return os.path.getsize(source)
+
+def readAlpha(fileName):
+	# Decode the png once and export only the alpha channel into a numpy array
+	# fileName can also be the png as bytes
+	with stage('png decode', sourceSize(fileName)):
+		if isinstance(fileName, (bytes, bytearray, memoryview)):
+			bezel = Image(blob=bytes(fileName))
+		else:
+			bezel = Image(filename=fileName)
+	with bezel:
+		with stage('alpha export'):
+			return bezel.width, bezel.height, exportAlpha(bezel)
+
+def exportAlpha(bezel):
+	alpha = numpy.empty((bezel.height, bezel.width), dtype=numpy.uint8)
+	if not library.MagickExportImagePixels(bezel.wand, 0, 0, bezel.width, bezel.height, b'A', STORAGE_TYPES.index('char'), alpha.ctypes.data_as(ctypes.c_void_p)):
+		bezel.raise_exception()
+	return alpha
+
+def triangleThreshold(histogram):
+	# Same triangle method ImageMagick uses for auto_threshold(method='triangle'), on a normalized 256 bin histogram
+	nonZero = numpy.flatnonzero(histogram)
+	if len(nonZero) == 0:
+		return 0
+	start = int(nonZero[0])
+	end = int(nonZero[-1])
+	peak = int(numpy.argmax(histogram))
+	x1 = float(peak)
+	y1 = float(histogram[peak])
+	x2 = float(end)
+	if (peak - start) >= (end - peak):
+		x2 = float(start)
+	a = y1
+	b = x2 - x1
+	c = -1.0 * (a * x1 + b * y1)
+	inverseRatio = 1.0 / (a * a + b * b + c * c) ** 0.5
+	threshold = 0
+	maxDistance = 0.0
+	if x2 == start:
+		candidates = range(start, peak)
+	else:
+		candidates = range(end, peak, -1)
+	for i in candidates:
+		segment = inverseRatio * (a * i + b * float(histogram[i]) + c)
+		if abs(segment) > maxDistance and ((segment > 0.0) if x2 == start else (segment < 0.0)):
+			threshold = i
+			maxDistance = abs(segment)
+	return threshold
+
+def alphaThreshold(histogram):
+	# The mask is the negated alpha channel, so flip the alpha histogram before looking for the split point
+	negated = numpy.asarray(histogram, dtype=numpy.float64)[::-1]
+	total = negated.sum()
+	if total > 0:
+		negated = negated / total
+	return triangleThreshold(negated)
+
+def alphaMask(alpha):
+	# True where the negated alpha is above the threshold, i.e. the white pixels of the old alphaMask.png
+	threshold = alphaThreshold(numpy.bincount(alpha.ravel(), minlength=256))
+	return alpha < (255 - threshold)
+
+class RunLabeler:
+	# Joins horizontal runs of mask pixels into 8-connected areas, one row at a time, top to bottom
+	def __init__(self, keepRuns=False):
+		self.parent = []
+		# left, top, right, bottom, first row, first column
+		self.boxes = []
+		self.previous = []
+		self.current = []
+		self.row = -1
+		self.scan = 0
+		# Every (row, start, end, label), only kept if asked for
+		self.runs = [] if keepRuns else None
+
+	def find(self, label):
+		while self.parent[label] != label:
+			self.parent[label] = self.parent[self.parent[label]]
+			label = self.parent[label]
+		return label
+
+	def union(self, first, second):
+		if second < first:
+			first, second = second, first
+		self.parent[second] = first
+		box = self.boxes[first]
+		other = self.boxes[second]
+		box[0] = min(box[0], other[0])
+		box[1] = min(box[1], other[1])
+		box[2] = max(box[2], other[2])
+		box[3] = max(box[3], other[3])
+		if (other[4], other[5]) < (box[4], box[5]):
+			box[4] = other[4]
+			box[5] = other[5]
+		return first
+
+	def addRun(self, row, start, end):
+		# Runs must arrive in raster order, end is exclusive
+		if row != self.row:
+			self.previous = self.current if row == self.row + 1 else []
+			self.current = []
+			self.row = row
+			self.scan = 0
+		previous = self.previous
+		while self.scan < len(previous) and previous[self.scan][1] < start:
+			self.scan += 1
+		label = -1
+		i = self.scan
+		while i < len(previous) and previous[i][0] <= end:
+			other = self.find(previous[i][2])
+			if label < 0:
+				label = other
+			elif other != label:
+				label = self.union(label, other)
+			i += 1
+		if label < 0:
+			label = len(self.parent)
+			self.parent.append(label)
+			self.boxes.append([start, row, end, row + 1, row, start])
+		else:
+			box = self.boxes[label]
+			box[0] = min(box[0], start)
+			box[2] = max(box[2], end)
+			box[3] = row + 1
+		self.current.append((start, end, label))
+		if self.runs is not None:
+			self.runs.append((row, start, end, label))
+
+	def repeatRow(self, count):
+		# The last row repeats count more times below itself. A run can only touch its own copy, so nothing new joins and the areas just get taller
+		for start, end, label in self.current:
+			box = self.boxes[self.find(label)]
+			box[3] = max(box[3], self.row + count + 1)
+			if self.runs is not None:
+				self.runs.extend((row, start, end, label) for row in range(self.row + 1, self.row + count + 1))
+		self.row += count
+
+	def components(self):
+		# Root label of each area, in the order ImageMagick numbers its components
+		roots = [label for label in range(len(self.parent)) if self.parent[label] == label]
+		roots.sort(key=lambda label: (self.boxes[label][4], self.boxes[label][5]))
+		return roots
+
+	def areas(self, minWidth=minWidth, minHeight=minHeight):
+		# (left, top, width, height) of each big enough area
+		boxes = [self.boxes[label] for label in self.components()]
+		return [(box[0], box[1], box[2] - box[0], box[3] - box[1]) for box in boxes if box[2] - box[0] >= minWidth and box[3] - box[1] >= minHeight]
+
+def maskRuns(mask):
+	# Row, start and end column of every run of mask pixels, in raster order
+	height, width = mask.shape
+	edges = numpy.zeros((height, width + 2), dtype=numpy.int8)
+	edges[:, 1:-1] = mask
+	changes = numpy.diff(edges, axis=1)
+	rows, starts = numpy.nonzero(changes == 1)
+	ends = numpy.nonzero(changes == -1)[1]
+	return zip(rows.tolist(), starts.tolist(), ends.tolist())
+
+def labelMask(mask, keepRuns=False):
+	# Rows that are the same as the one above are only counted, most of a bezel is the same row over and over
+	labeler = RunLabeler(keepRuns)
+	height = mask.shape[0]
+	if height == 0:
+		return labeler
+	changed = numpy.ones(height, dtype=bool)
+	changed[1:] = (mask[1:] != mask[:-1]).any(axis=1)
+	rowIndex = numpy.flatnonzero(changed)
+	repeats = (numpy.diff(numpy.append(rowIndex, height)) - 1).tolist()
+	rowIndex = rowIndex.tolist()
+	lastRow = -1
+	for row, start, end in maskRuns(mask[changed]):
+		if row != lastRow:
+			if lastRow >= 0 and repeats[lastRow] > 0:
+				labeler.repeatRow(repeats[lastRow])
+			lastRow = row
+		labeler.addRun(rowIndex[row], start, end)
+	if lastRow >= 0 and repeats[lastRow] > 0:
+		labeler.repeatRow(repeats[lastRow])
+	return labeler
+
+def findAreas(mask, minWidth=minWidth, minHeight=minHeight):
+	return labelMask(mask).areas(minWidth, minHeight)
+
+def finishFitRun(fit, left):
+	# Adds the rows that repeated the last one to heights, then looks for the best rectangle on the last of them
+	# lefts and rights don't change over repeated rows and every height only grows, so sizes are largest on the last row
+	if fit['cells'] is None:
+		return
+	if fit['repeats'] > 0:
+		fit['heights'] = numpy.where(fit['heights'] > 0, fit['heights'] + fit['repeats'], 0)
+		fit['repeats'] = 0
+	sizes = (fit['rights'] - fit['lefts']) * fit['heights']
+	best = int(numpy.argmax(sizes))
+	if sizes[best] > fit['size']:
+		fit['size'] = int(sizes[best])
+		fitHeight = int(fit['heights'][best])
+		fit['area'] = (left + int(fit['lefts'][best]), fit['row'] - fitHeight + 1, int(fit['rights'][best] - fit['lefts'][best]), fitHeight)
+
+def inscribedAreas(maskRows, boxes):
+	# Largest rectangle inside each (left, top, width, height) box that is all mask pixels, for holes with rounded corners
+	# or vignetted edges where the bounding box reaches into the art. maskRows yields the mask rows top to bottom, so a
+	# full mask or streamed rows both work, and it stops reading after the last box
+	# Each row is one numpy pass per box: for every column, how many rows of mask end here (heights), and how far left
+	# and right a rectangle that tall can reach (lefts, rights), carried down from the row above. The best rectangle
+	# ending on a row is the widest of those, so every pixel is looked at once
+	# Like labelMask, rows that are the same as the one above are only counted, and checked once at the end of the run
+	fits = []
+	for left, top, width, height in boxes:
+		fits.append({'heights': numpy.zeros(width, dtype=numpy.int64), 'lefts': numpy.zeros(width, dtype=numpy.int64), 'rights': numpy.full(width, width, dtype=numpy.int64), 'size': 0, 'area': (left, top, 0, 0), 'cells': None, 'repeats': 0, 'row': top})
+	columns = [numpy.arange(width) for left, top, width, height in boxes]
+	lastRow = max((top + height for left, top, width, height in boxes), default=0)
+	for row, maskRow in enumerate(maskRows):
+		if row >= lastRow:
+			break
+		for (left, top, width, height), fit, column in zip(boxes, fits, columns):
+			if row < top or row >= top + height:
+				continue
+			cells = maskRow[left:left + width]
+			if fit['cells'] is not None and numpy.array_equal(cells, fit['cells']):
+				fit['repeats'] += 1
+				fit['row'] = row
+				continue
+			finishFitRun(fit, left)
+			fit['heights'] = numpy.where(cells, fit['heights'] + 1, 0)
+			# First column after the last gap to the left, and the first gap to the right, in this row
+			rowLefts = numpy.maximum.accumulate(numpy.where(cells, 0, column + 1))
+			rowRights = numpy.minimum.accumulate(numpy.where(cells, width, column)[::-1])[::-1]
+			fit['lefts'] = numpy.where(cells, numpy.maximum(fit['lefts'], rowLefts), 0)
+			fit['rights'] = numpy.where(cells, numpy.minimum(fit['rights'], rowRights), width)
+			fit['cells'] = cells
+			fit['row'] = row
+	for (left, top, width, height), fit in zip(boxes, fits):
+		finishFitRun(fit, left)
+	return [fit['area'] for fit in fits]
+
+def shrinkMask(mask, scale):
+	# A block of scale x scale pixels is set if any pixel in it is, so 8-connected areas stay connected
+	height, width = mask.shape
+	rows = -(-height // scale)
+	cols = -(-width // scale)
+	if scale % 8 != 0:
+		shrunk = numpy.logical_or.reduceat(mask, numpy.arange(0, height, scale), axis=0)
+		return numpy.logical_or.reduceat(shrunk, numpy.arange(0, width, scale), axis=1)
+	if rows * scale != height or cols * scale != width or not mask.flags.c_contiguous:
+		padded = numpy.zeros((rows * scale, cols * scale), dtype=bool)
+		padded[:height, :width] = mask
+		mask = padded
+	# Look at 8 pixels at a time as one 64 bit word
+	words = mask.view(numpy.uint64).reshape(rows, scale, cols, scale // 8)
+	return numpy.bitwise_or.reduce(numpy.bitwise_or.reduce(words, axis=3), axis=1) != 0
+
+def findAreasCoarse(mask, scale=coarseScale, minWidth=minWidth, minHeight=minHeight):
+	# Finds candidate areas on the shrunk mask, then labels full size pixels only inside those candidates
+	# Every full size area falls inside exactly one shrunk area, so the result is the same as findAreas
+	height, width = mask.shape
+	if height == 0 or width == 0:
+		return []
+	shrunk = shrinkMask(mask, scale)
+	coarse = labelMask(shrunk, keepRuns=True)
+	roots = coarse.components()
+	blockRuns = {}
+	for row, start, end, label in coarse.runs:
+		blockRuns.setdefault(coarse.find(label), []).append((row, start, end))
+	found = []
+	for root in roots:
+		left, top, right, bottom = coarse.boxes[root][:4]
+		if (right - left) * scale < minWidth or (bottom - top) * scale < minHeight:
+			continue
+		blocks = numpy.zeros((bottom - top, right - left), dtype=bool)
+		for row, start, end in blockRuns[root]:
+			blocks[row - top, start - left:end - left] = True
+		windowTop = top * scale
+		windowLeft = left * scale
+		windowBottom = min(bottom * scale, height)
+		windowRight = min(right * scale, width)
+		window = mask[windowTop:windowBottom, windowLeft:windowRight]
+		if not numpy.array_equal(shrunk[top:bottom, left:right], blocks):
+			# Other areas reach into this box, keep only the pixels under this area's blocks
+			window = window & numpy.repeat(numpy.repeat(blocks, scale, axis=0), scale, axis=1)[:windowBottom - windowTop, :windowRight - windowLeft]
+		fine = labelMask(window)
+		for label in fine.components():
+			box = fine.boxes[label]
+			found.append((box[4] + windowTop, box[5] + windowLeft, box[0] + windowLeft, box[1] + windowTop, box[2] - box[0], box[3] - box[1]))
+	found.sort()
+	return [area[2:] for area in found if area[4] >= minWidth and area[5] >= minHeight]
+
+def saveMask(mask, fileName):
+	# Black & white copy of the mask, only used for debug output
+	with Image.from_array(mask.view(numpy.uint8) * 255, channel_map='I') as maskImage:
+		maskImage.save(filename=fileName)
+
+def streamMaskRows(fileName, limit):
+	for alphaRow in pngstream.alphaRows(fileName):
+		yield alphaRow < limit
+
+def detectStream(fileName, debugName=None, minWidth=minWidth, minHeight=minHeight, fit='box'):
+	# Bounded memory detection straight from the png file, one row at a time: the first pass builds the alpha histogram,
+	# the second labels the mask rows as they come. Only a couple of rows are ever held, so any image size fits in memory
+	# With fit='inscribed', another pass fits the largest rectangle in each area, and the boxes are returned as well
+	# Returns (width, height, areas, boxes), boxes is None unless fit is 'inscribed'
+	# Raises pngstream.UnsupportedPng for files the row reader can't do, those need detectFile's normal path
+	width, height = pngstream.readHeader(fileName)[:2]
+	fileSize = sourceSize(fileName)
+	with stage('streamed histogram', fileSize):
+		histogram = numpy.zeros(256, dtype=numpy.int64)
+		for alphaRow in pngstream.alphaRows(fileName):
+			histogram += numpy.bincount(alphaRow, minlength=256)
+		limit = 255 - alphaThreshold(histogram)
+	with stage('streamed labelling', fileSize):
+		labeler = RunLabeler()
+		previous = None
+		repeats = 0
+		for row, maskRow in enumerate(streamMaskRows(fileName, limit)):
+			if previous is not None and numpy.array_equal(maskRow, previous):
+				repeats += 1
+				continue
+			# Only a row with runs can be repeated, labeler.row is the last row that had any
+			if repeats > 0 and labeler.row == row - repeats - 1:
+				labeler.repeatRow(repeats)
+			repeats = 0
+			previous = maskRow
+			for runRow, start, end in maskRuns(maskRow[numpy.newaxis]):
+				labeler.addRun(row, start, end)
+		if repeats > 0 and labeler.row == height - repeats - 1:
+			labeler.repeatRow(repeats)
+		areas = labeler.areas(minWidth, minHeight)
+	boxes = None
+	if fit == 'inscribed' and len(areas) > 0:
+		with stage('inscribed fit', fileSize):
+			boxes = areas
+			areas = inscribedAreas(streamMaskRows(fileName, limit), boxes)
+	elif fit == 'inscribed':
+		boxes = []
+	if debugName is not None and len(areas) != 1:
+		# Rare enough that reading the file a third time beats holding the mask
+		with stage('debug mask', fileSize) as counts:
+			os.makedirs(os.path.dirname(debugName), exist_ok=True)
+			with pngstream.PngWriter(debugName, width, height, bitDepth=1) as maskImage:
+				for maskRow in streamMaskRows(fileName, limit):
+					maskImage.writeRow(numpy.packbits(maskRow).tobytes())
+			counts['written'] = os.path.getsize(debugName)
+	return width, height, areas, boxes
+
+def detectFile(fileName, debugName=None, scale=0, verify=False, stream=False, fit='box'):
+	# One whole png, used directly or as a worker in a process pool: returns the image size, the transparent areas,
+	# whether the fast (coarse or streamed) areas matched the full size ones (None unless verify is set), and the
+	# bounding boxes of the areas if fit is 'inscribed' (None otherwise, the areas are the boxes)
+	# With fit='inscribed', each area is the largest rectangle that is transparent all over inside its bounding box
+	# If stream is set, the png is read a row at a time with detectStream, falling back to the normal path if it can't be
+	# If scale is more than 1, areas are found with coarse detection on a mask shrunk by that much
+	# If debugName is set and there isn't exactly one area, the mask is saved there
+	# fileName can also be the png as bytes
+	fastAreas = None
+	if stream:
+		try:
+			width, height, fastAreas, boxes = detectStream(fileName, None if verify else debugName, fit='box' if verify else fit)
+		except pngstream.UnsupportedPng:
+			stream = False
+		else:
+			if not verify:
+				return width, height, fastAreas, None, boxes
+	width, height, alpha = readAlpha(fileName)
+	with stage('threshold'):
+		mask = alphaMask(alpha)
+	verified = None
+	if scale > 1 and not stream and not verify:
+		with stage('coarse labelling'):
+			areas = findAreasCoarse(mask, scale)
+	else:
+		with stage('labelling'):
+			areas = findAreas(mask)
+		if verify and fastAreas is None and scale > 1:
+			with stage('coarse labelling'):
+				fastAreas = findAreasCoarse(mask, scale)
+		if fastAreas is not None:
+			verified = fastAreas == areas
+	boxes = None
+	if fit == 'inscribed':
+		with stage('inscribed fit'):
+			boxes = areas
+			areas = inscribedAreas(mask, boxes)
+	if debugName is not None and len(areas) != 1:
+		with stage('debug mask') as counts:
+			os.makedirs(os.path.dirname(debugName), exist_ok=True)
+			saveMask(mask, debugName)
+			counts['written'] = os.path.getsize(debugName)
+	return width, height, areas, verified, boxes
+
+def detectProfiled(fileName, *args, **kwargs):
+	# detectFile that also returns the stage times (a dict from bezelprofile.StageTimes) of this file, for profiling workers
+	global profile
+	profile = bezelprofile.StageTimes()
+	try:
+		return detectFile(fileName, *args, **kwargs), profile.stages
+	finally:
+		profile = None
+
+def detectOrError(detect, fileName, *args):
+	# Runs detect (detectFile or detectProfiled) on one file of a batch and returns the error instead of raising it, so a
+	# bad png in a worker doesn't end the results of every file after it
+	try:
+		return detect(fileName, *args)
+	except readErrors as error:
+		return error
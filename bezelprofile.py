@@ -0,0 +1,120 @@
+import os
+import sys
+import json
+import math
+import time
+import contextlib
+
+# How many of the slowest files go in the report
+slowestCount = 10
+
+class StageTimes:
+	# Wall time, CPU time and bytes read/written for each named stage, kept as plain dicts so workers can send them back
+	def __init__(self):
+		self.stages = {}
+
+	@contextlib.contextmanager
+	def stage(self, name, bytesRead=0):
+		# Times the block, the caller can add to 'read' and 'written' in the dict it gets
+		counts = {'read': bytesRead, 'written': 0}
+		wall = time.perf_counter()
+		cpu = time.process_time()
+		try:
+			yield counts
+		finally:
+			self.add(name, time.perf_counter() - wall, time.process_time() - cpu, counts['read'], counts['written'])
+
+	def add(self, name, wall, cpu, bytesRead=0, bytesWritten=0, count=1):
+		entry = self.stages.setdefault(name, {'wall': 0.0, 'cpu': 0.0, 'read': 0, 'written': 0, 'count': 0})
+		entry['wall'] += wall
+		entry['cpu'] += cpu
+		entry['read'] += bytesRead
+		entry['written'] += bytesWritten
+		entry['count'] += count
+
+	def merge(self, stages):
+		for name, entry in stages.items():
+			self.add(name, entry['wall'], entry['cpu'], entry['read'], entry['written'], entry['count'])
+
+	def total(self, key):
+		return sum(entry[key] for entry in self.stages.values())
+
+def percentile(values, fraction):
+	# Nearest rank on an already sorted list
+	if len(values) == 0:
+		return 0.0
+	return values[min(len(values) - 1, max(0, math.ceil(fraction * len(values)) - 1))]
+
+class Profiler:
+	# Stage times for a whole run: one StageTimes per file plus one for work not tied to a file (reading the XML, etc)
+	def __init__(self, script):
+		self.script = script
+		self.started = time.time()
+		self.wall = time.perf_counter()
+		self.cpu = time.process_time()
+		self.childCpu = childCpu()
+		self.run = StageTimes()
+		self.files = {}
+
+	def fileTimes(self, fileName):
+		return self.files.setdefault(fileName, StageTimes())
+
+	def stage(self, name, fileName=None, bytesRead=0):
+		if fileName is None:
+			return self.run.stage(name, bytesRead)
+		return self.fileTimes(fileName).stage(name, bytesRead)
+
+	def addFile(self, fileName, stages):
+		# Stage times sent back by a worker process
+		self.fileTimes(fileName).merge(stages)
+
+	def report(self):
+		totals = StageTimes()
+		totals.merge(self.run.stages)
+		for times in self.files.values():
+			totals.merge(times.stages)
+		fileWalls = sorted(times.total('wall') for times in self.files.values())
+		percentiles = {}
+		for name in totals.stages:
+			walls = sorted(times.stages[name]['wall'] for times in self.files.values() if name in times.stages)
+			if len(walls) > 0:
+				percentiles[name] = {'p50': percentile(walls, 0.5), 'p90': percentile(walls, 0.9), 'p99': percentile(walls, 0.99), 'max': walls[-1]}
+		if len(fileWalls) > 0:
+			percentiles['file'] = {'p50': percentile(fileWalls, 0.5), 'p90': percentile(fileWalls, 0.9), 'p99': percentile(fileWalls, 0.99), 'max': fileWalls[-1]}
+		slowest = sorted(self.files, key=lambda fileName: self.files[fileName].total('wall'), reverse=True)[:slowestCount]
+		return {
+			'script': self.script,
+			'arguments': sys.argv[1:],
+			'started': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.started)),
+			'wall': time.perf_counter() - self.wall,
+			# CPU time of this process and any finished worker processes
+			'cpu': time.process_time() - self.cpu + childCpu() - self.childCpu,
+			'fileCount': len(self.files),
+			'totals': totals.stages,
+			'run': self.run.stages,
+			'percentiles': percentiles,
+			'slowest': [{'file': fileName, 'wall': self.files[fileName].total('wall'), 'cpu': self.files[fileName].total('cpu'), 'stages': self.files[fileName].stages} for fileName in slowest],
+			'files': {fileName: times.stages for fileName, times in self.files.items()},
+		}
+
+	def save(self, fileName):
+		# Returns False if the report couldn't be written
+		try:
+			with open(fileName, 'w') as reportFile:
+				json.dump(self.report(), reportFile, indent=1)
+		except OSError:
+			return False
+		return True
+
+def childCpu():
+	try:
+		times = os.times()
+	except OSError:
+		return 0.0
+	return times.children_user + times.children_system
+
+def stage(profiler, name, fileName=None, bytesRead=0):
+	# profiler.stage, or an untimed block if profiling is off (profiler is None)
+	if profiler is None:
+		return contextlib.nullcontext({'read': 0, 'written': 0})
+	return profiler.stage(name, fileName, bytesRead)
@@ -0,0 +1,91 @@
+import os
+import time
+from os.path import join, dirname, getsize
+from wand.image import Image
+from wand.exceptions import WandException
+import bezelwriters
+
+# Each variant goes in a folder named for its height next to the png, e.g. 720p
+folderFormat = '{}p'
+# ImageMagick png quality: zlib level 9 with adaptive filtering, used when recompressing
+recompressQuality = 95
+# Chunks left out when recompressing: text (including ImageMagick's dates and EXIF/XMP profiles) and the timestamp
+# Colour chunks (gAMA, sRGB, cHRM, iCCP) are kept so the copies look the same as the original
+recompressExclude = 'tEXt,zTXt,iTXt,tIME,date'
+# Errors that stop one png's variants without stopping the rest
+variantErrors = (OSError, ValueError, WandException)
+
+def parseHeights(text):
+	# '1080,720' or '1080p,720p' -> [1080, 720], largest first. Raises ValueError for anything else
+	heights = set()
+	for height in text.split(','):
+		height = int(height.strip().lower().rstrip('p'))
+		if height <= 0:
+			raise ValueError('Heights must be greater than 0')
+		heights.add(height)
+	if len(heights) == 0:
+		raise ValueError('No heights given')
+	return sorted(heights, reverse=True)
+
+def variantFolders(heights):
+	return [folderFormat.format(height) for height in heights]
+
+def scaledSize(width, height, targetHeight):
+	# Same shape as the original at targetHeight
+	return max(1, round(width * targetHeight / height)), targetHeight
+
+def scaleArea(area, width, height, newWidth, newHeight):
+	# (left, top, width, height) in a width x height bezel, moved to the same place in a newWidth x newHeight copy
+	# Edges are rounded outwards so the screen still covers the whole hole, the bezel is drawn over any overlap
+	left, top, areaWidth, areaHeight = area
+	newLeft = left * newWidth // width
+	newTop = top * newHeight // height
+	newRight = -(-(left + areaWidth) * newWidth // width)
+	newBottom = -(-(top + areaHeight) * newHeight // height)
+	return newLeft, newTop, newRight - newLeft, newBottom - newTop
+
+def scalePng(pngName, targets, recompress=False):
+	# Decodes pngName once and saves a resized copy for each (file name, width, height) in targets
+	with Image(filename=pngName) as bezel:
+		for fileName, width, height in targets:
+			with bezel.clone() as variant:
+				variant.resize(width, height, filter='lanczos')
+				if recompress:
+					# Lossless: text and time chunks are dropped and the pixels are packed harder, colour chunks are kept
+					variant.options['png:exclude-chunk'] = recompressExclude
+					variant.compression_quality = recompressQuality
+				variant.save(filename=fileName)
+
+def writeVariants(pngName, setName, bezelWidth, bezelHeight, area, heights, emit, opacity, recompress=False):
+	# Runs in a worker: writes a scaled copy of the png and its outputs (emit, as for createbezels) for each height smaller
+	# than the original, in that height's folder next to the png. The viewport is scaled with the image, not detected again
+	# Returns (heights written, bytes written, seconds, CPU seconds)
+	wall = time.perf_counter()
+	cpu = time.process_time()
+	targets = []
+	for targetHeight in heights:
+		if targetHeight >= bezelHeight:
+			continue
+		variantPath = join(dirname(pngName), folderFormat.format(targetHeight))
+		os.makedirs(variantPath, exist_ok=True)
+		newWidth, newHeight = scaledSize(bezelWidth, bezelHeight, targetHeight)
+		targets.append((variantPath, newWidth, newHeight))
+	if len(targets) == 0:
+		return [], 0, time.perf_counter() - wall, time.process_time() - cpu
+	scalePng(pngName, [(join(variantPath, setName + '.png'), newWidth, newHeight) for variantPath, newWidth, newHeight in targets], recompress)
+	written = 0
+	for variantPath, newWidth, newHeight in targets:
+		newArea = scaleArea(area, bezelWidth, bezelHeight, newWidth, newHeight)
+		outputs = [setName + '.png']
+		if 'info' in emit:
+			bezelwriters.writeInfo(variantPath, setName, newWidth, newHeight, newArea, opacity)
+			outputs.append(setName + '.info')
+		layText = bezelwriters.layoutText(setName, newWidth, newHeight, newArea)
+		if 'lay' in emit:
+			bezelwriters.writeLayout(variantPath, setName, layText)
+			outputs.append(setName + '.lay')
+		if 'zip' in emit:
+			bezelwriters.writeArtZip(variantPath, setName, layText)
+			outputs.append(setName + '.zip')
+		written += sum(getsize(join(variantPath, output)) for output in outputs)
+	return [newHeight for variantPath, newWidth, newHeight in targets], written, time.perf_counter() - wall, time.process_time() - cpu
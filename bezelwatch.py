@@ -0,0 +1,113 @@
+import os
+import time
+import zipfile
+from os.path import join, splitext
+
+# Seconds between looks at the folder, a file has to stay the same for one whole interval before it is used
+pollInterval = 2.0
+# Last 12 bytes of every complete png
+pngEnd = b'\x00\x00\x00\x00IEND\xaeB`\x82'
+
+# Folders the scripts write into, --recursive doesn't look inside them
+outputFolders = ['Debug', 'Unknown']
+
+def scanFolder(folder, recursive=False, skip=outputFolders):
+	# Yields (name, DirEntry) for every file in folder, links to files are followed
+	# With recursive, files in subfolders are included too, named by their path from folder (snes/mario.png)
+	# Each folder's files come before its subfolders, so files from one folder stay together. Folders named in skip aren't searched
+	# Links to folders aren't followed, like os.walk, so a link back up the tree can't make the same files show up again
+	subFolders = ['']
+	while len(subFolders) > 0:
+		subFolder = subFolders.pop(0)
+		found = []
+		try:
+			with os.scandir(join(folder, subFolder)) as entries:
+				for entry in entries:
+					try:
+						if entry.is_file():
+							yield join(subFolder, entry.name), entry
+						elif recursive and entry.is_dir(follow_symlinks=False) and entry.name not in skip:
+							found.append(join(subFolder, entry.name))
+					except OSError:
+						pass
+		except OSError:
+			if subFolder == '':
+				raise
+		subFolders[0:0] = sorted(found)
+
+def folderState(folder, extensions, recursive=False, skip=outputFolders):
+	# name -> (size, mtime) of each file in folder with one of the extensions
+	state = {}
+	for name, entry in scanFolder(folder, recursive, skip):
+		if splitext(name)[1].lower() not in extensions:
+			continue
+		try:
+			fileStat = entry.stat()
+		except OSError:
+			continue
+		state[name] = (fileStat.st_size, fileStat.st_mtime_ns)
+	return state
+
+def isComplete(fileName):
+	# A png or zip that is still being copied in doesn't have its ending yet
+	try:
+		if fileName.lower().endswith('.png'):
+			with open(fileName, 'rb') as pngFile:
+				pngFile.seek(-len(pngEnd), os.SEEK_END)
+				return pngFile.read() == pngEnd
+		if fileName.lower().endswith('.zip'):
+			return zipfile.is_zipfile(fileName)
+	except OSError:
+		return False
+	return True
+
+class FolderWatch:
+	# Polls a folder for new or changed files, so it works the same on every OS and network shares without extra packages
+	def __init__(self, folder, extensions, interval=pollInterval, recursive=False, skip=outputFolders):
+		self.folder = folder
+		self.recursive = recursive
+		self.skip = skip
+		self.extensions = [extension.lower() for extension in extensions]
+		self.interval = interval
+		self.state = folderState(folder, self.extensions, recursive, skip)
+		# Changed files waiting to settle, name -> (size, mtime) last seen
+		self.pending = {}
+
+	def wait(self):
+		# Blocks until some files have been added or changed and have settled, returns [(name, old (size, mtime) or None)]
+		# Returns None if Ctrl+C is pressed while waiting
+		try:
+			while True:
+				time.sleep(self.interval)
+				current = folderState(self.folder, self.extensions, self.recursive, self.skip)
+				for name in list(self.state):
+					if name not in current:
+						del self.state[name]
+				for name in list(self.pending):
+					if name not in current:
+						del self.pending[name]
+				ready = []
+				for name, fileStat in current.items():
+					if self.state.get(name) == fileStat:
+						self.pending.pop(name, None)
+					elif self.pending.get(name) == fileStat and isComplete(join(self.folder, name)):
+						ready.append((name, self.state.get(name)))
+						self.state[name] = fileStat
+						del self.pending[name]
+					else:
+						self.pending[name] = fileStat
+				if len(ready) > 0:
+					return sorted(ready)
+		except KeyboardInterrupt:
+			return None
+
+	def refresh(self, names):
+		# Take the current state of files we changed ourselves, so they aren't picked up as new work
+		for name in names:
+			try:
+				fileStat = os.stat(join(self.folder, name))
+			except OSError:
+				self.state.pop(name, None)
+			else:
+				self.state[name] = (fileStat.st_size, fileStat.st_mtime_ns)
+			self.pending.pop(name, None)
@@ -0,0 +1,86 @@
+from os.path import join
+from zipfile import ZipFile, ZIP_STORED, ZIP_DEFLATED
+
+# Output types that can be written for each bezel, and the file extension for each
+outputTypes = ['info', 'lay', 'zip']
+
+def infoText(bezelWidth, bezelHeight, area, opacity):
+	# Retroarch/Batocera .info for one viewport, area is (left, top, width, height)
+	left, top, width, height = area
+	infoLines = [
+		'{',
+		' "width":{},'.format(bezelWidth),
+		' "height":{},'.format(bezelHeight),
+		' "top":{},'.format(top),
+		' "left":{},'.format(left),
+		' "bottom":{},'.format(bezelHeight - (top + height)),
+		' "right":{},'.format(bezelWidth - (left + width)),
+		' "opacity":{},'.format(str(opacity)),
+		' "messagex":0.22,',
+		' "messagey":0.12',
+	]
+	return '\n'.join(infoLines) + '\n}'
+
+def layoutText(setName, bezelWidth, bezelHeight, area):
+	# MAME artwork layout showing setName.png around one screen, area is (left, top, width, height)
+	left, top, width, height = area
+	layLines = [
+		'<?xml version="1.0"?>',
+		f'<!-- {setName}.lay -->',
+		'',
+		'<mamelayout version="2">',
+		'\t<element name="bezel">',
+		f'\t\t<image file="{setName}.png" />',
+		'\t</element>',
+		'\t<view name="Upright Artwork">',
+		'\t\t<screen index="0">',
+		f'\t\t\t<bounds x="{left}" y="{top}" width="{width}" height="{height}" />',
+		'\t\t</screen>',
+		'\t\t<element ref="bezel">',
+		f'\t\t\t<bounds x="0" y="0" width="{bezelWidth}" height="{bezelHeight}" />',
+		'\t\t</element>',
+		'\t</view>',
+		'</mamelayout>',
+		'',
+		'<!-- Created by Bezel Tools script - https://github.com/TVsIan/bezeltools -->',
+	]
+	return '\n'.join(layLines) + '\n'
+
+def writeInfo(filePath, setName, bezelWidth, bezelHeight, area, opacity):
+	with open(join(filePath, setName + '.info'), 'w') as infoFile:
+		infoFile.write(infoText(bezelWidth, bezelHeight, area, opacity))
+
+def writeLayout(filePath, setName, layText):
+	with open(join(filePath, setName + '.lay'), 'w') as layFile:
+		layFile.write(layText)
+
+def writeArtZip(filePath, setName, layText, pngData=None):
+	# MAME artwork zip with the png and its .lay
+	# The png is already compressed so it's stored as is, the .lay goes in straight from memory
+	# pngData is the png itself, for one that isn't saved next to the zip
+	with ZipFile(join(filePath, setName + '.zip'), 'w', ZIP_DEFLATED) as mameArtFile:
+		if pngData is None:
+			mameArtFile.write(join(filePath, setName + '.png'), setName + '.png', compress_type=ZIP_STORED)
+		else:
+			mameArtFile.writestr(setName + '.png', bytes(pngData), compress_type=ZIP_STORED)
+		mameArtFile.writestr(setName + '.lay', layText)
+
+class ArtPack:
+	# One zip with every game's artwork in its own folder, ready to unzip into MAME's artwork folder
+	# Entries are streamed to disk as they are added
+	def __init__(self, fileName):
+		self.fileName = fileName
+		self.packFile = ZipFile(fileName, 'w', ZIP_DEFLATED)
+		self.setNames = set()
+
+	def add(self, filePath, setName, layText):
+		# Returns False if setName is already in the pack, which can happen when pngs come from more than one folder
+		if setName in self.setNames:
+			return False
+		self.setNames.add(setName)
+		self.packFile.write(join(filePath, setName + '.png'), setName + '/' + setName + '.png', compress_type=ZIP_STORED)
+		self.packFile.writestr(setName + '/' + setName + '.lay', layText)
+		return True
+
+	def close(self):
+		self.packFile.close()
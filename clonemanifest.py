@@ -0,0 +1,67 @@
+import os
+from os.path import join, exists
+import jsonmanifest
+
+manifestName = 'clonemanifest.json'
+# Bump when the layout of the manifest changes
+manifestVersion = 1
+
+class CloneManifest(jsonmanifest.FolderManifest):
+	# Manifest kept in the bezel folder of every file mameclonebezels made: target -> the source it was copied from and the
+	# source's content hash at the time. Files that were edited or replaced since then are the artist's and are never touched
+	def __init__(self, folder):
+		super().__init__(folder, manifestName, manifestVersion)
+		# target -> {'source': name, 'sha1': hash of the source when it was copied}
+		self.copies = {}
+		saved = self.load('copies')
+		if saved is not None:
+			self.copies = saved[0]
+
+	def fileHash(self, name):
+		# None if the file is gone or can't be read
+		try:
+			return super().fileHash(name)
+		except OSError:
+			return None
+
+	def isGenerated(self, target):
+		# True if we made target and it still holds what we copied, or what its source holds now (links follow their source)
+		copy = self.copies.get(target)
+		if copy is None:
+			return False
+		targetHash = self.fileHash(target)
+		return targetHash is not None and targetHash in [copy['sha1'], self.fileHash(copy['source'])]
+
+	def isCurrent(self, target, source):
+		# True if target is our copy of source and source hasn't changed since
+		copy = self.copies.get(target)
+		return copy is not None and copy['source'] == source and self.fileHash(target) == self.fileHash(source)
+
+	def sourceOf(self, target):
+		return self.copies[target]['source']
+
+	def generatedFiles(self):
+		# Every target we made that is still ours, records of files that were removed or replaced are dropped
+		for target in list(self.copies):
+			if not self.isGenerated(target):
+				self.forget(target)
+		return sorted(self.copies)
+
+	def record(self, target, source):
+		# target was just copied or linked from source, so it has the same contents
+		sha1 = self.fileHash(source)
+		try:
+			fileStat = os.stat(join(self.folder, target))
+		except OSError:
+			return
+		self.files[target] = {'size': fileStat.st_size, 'mtime': fileStat.st_mtime_ns, 'sha1': sha1}
+		self.copies[target] = {'source': source, 'sha1': sha1}
+
+	def forget(self, target):
+		self.copies.pop(target, None)
+
+	def save(self):
+		# Drops files that are gone, only files that are copies or sources are kept
+		used = set(self.copies) | set(copy['source'] for copy in self.copies.values())
+		self.files = {name: entry for name, entry in self.files.items() if name in used and exists(join(self.folder, name))}
+		return self.saveData(copies=self.copies)
@@ -0,0 +1,556 @@
+import sys
+import getopt
+import os
+import textwrap
+import functools
+import bezeldetect
+import bezelcache
+import bezelwriters
+import bezelprofile
+import bezelwatch
+import bezelaudit
+import bezelvariants
+from os.path import join, splitext, exists
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from tkinter import filedialog
+
+def outputList(emit):
+	# '.info file', '.lay and .zip files', etc for console messages
+	names = ['.' + output for output in emit]
+	if len(names) == 1:
+		return names[0] + ' file'
+	return ', '.join(names[:-1]) + ' and ' + names[-1] + ' files'
+
+def main(argv, emit=None):
+	# Set defaults
+	# createinfos.py and createmameart.py call this with their own default outputs
+	filePath = join(os.getcwd(), 'bezels')
+	if emit is None:
+		emit = list(bezelwriters.outputTypes)
+	skipMode = False
+	debugMode = False
+	verbose = False
+	jobs = 1
+	cacheMode = False
+	packFile = None
+	coarseScale = 0
+	verifyMode = False
+	streamMode = False
+	profileFile = None
+	watchMode = False
+	watchInterval = bezelwatch.pollInterval
+	recursiveMode = False
+	auditMode = False
+	crcMode = False
+	fitMode = 'box'
+	variantHeights = []
+	recompressMode = False
+	opacity = 0.7
+
+	# Command Line options
+	# v = verbose, d = debug, p = file path, e = outputs to write
+	try:
+		opts, args = getopt.getopt(argv, '?vsdo:p:uj:ce:', ['help', 'skip', 'debug', 'verbose','opacity=','path=','ui','jobs=','cache','emit=','pack=','coarse=','verify','stream','profile=','watch','interval=','recursive','audit','crc','fit=','variants=','recompress'])
+	except getopt.GetoptError:
+		print('Invalid command line option. Use -? or --help to see available options.')
+		sys.exit()
+	for opt, arg in opts:
+		if opt in ['-v', '--verbose']:
+			verbose = True
+			print('Verbose mode enabled.')
+		if opt in ['-s', '--skip']:
+			skipMode = True
+			if verbose:
+				print('Skip existing enabled.')
+		if opt in ['-d', '--debug']:
+			debugMode = True
+			if verbose:
+				print('Debug mode enabled.')
+		if opt in ['-u', '--ui']:
+			scriptDir = os.path.dirname(os.path.abspath(sys.argv[0]))
+			filePath = filedialog.askdirectory(initialdir=scriptDir)
+			if not exists(filePath):
+				print('Cancelled or bad path selected.')
+				sys.exit()
+		elif opt in ['-p', '--path']:
+			if exists(arg):
+				filePath = arg
+			elif exists(join(os.getcwd(), arg)):
+				filePath = join(os.getcwd(), arg)
+			else:
+				print('Path {} does not exist!'.format(arg))
+				sys.exit()
+			if verbose:
+				print('File path set to {}'.format(filePath))
+		elif opt in ['-o', '--opacity']:
+			opacity = float(arg)
+			if opacity <= 0 or opacity > 1:
+				print('Opacity must be greater than 0 and no higher than 1.')
+				sys.exit()
+			if verbose:
+				print('Opacity set to {}'.format(str(opacity)))
+		elif opt in ['-j', '--jobs']:
+			try:
+				jobs = int(arg)
+			except ValueError:
+				jobs = -1
+			if jobs < 0:
+				print('Jobs must be a whole number, 0 uses all available cores.')
+				sys.exit()
+			if jobs == 0:
+				jobs = os.cpu_count() or 1
+			if verbose:
+				print('Processing {} file(s) at a time'.format(jobs))
+		elif opt in ['-c', '--cache']:
+			cacheMode = True
+			if verbose:
+				print('Saved detection results will be used for unchanged files.')
+		elif opt in ['-e', '--emit']:
+			emit = [output.strip().lstrip('.') for output in arg.split(',') if output.strip() != '']
+			for output in emit:
+				if output not in bezelwriters.outputTypes:
+					print('Unknown output {}, must be one or more of: {}'.format(output, ','.join(bezelwriters.outputTypes)))
+					sys.exit()
+			if verbose:
+				print('Writing {} files'.format(', '.join(emit)))
+		elif opt == '--pack':
+			packFile = os.path.abspath(arg)
+			if not exists(os.path.dirname(packFile)):
+				print('Path {} does not exist!'.format(os.path.dirname(packFile)))
+				sys.exit()
+			if verbose:
+				print('MAME artwork will be written to {}'.format(packFile))
+		elif opt == '--coarse':
+			try:
+				coarseScale = int(arg)
+			except ValueError:
+				coarseScale = 0
+			if coarseScale < 2:
+				print('Coarse scale must be a whole number of at least 2.')
+				sys.exit()
+			if verbose:
+				print('Coarse detection enabled, mask shrunk by {}'.format(coarseScale))
+		elif opt == '--verify':
+			verifyMode = True
+			if verbose:
+				print('Fast detection will be checked against full size detection.')
+		elif opt == '--profile':
+			profileFile = os.path.abspath(arg)
+			if not exists(os.path.dirname(profileFile)):
+				print('Path {} does not exist!'.format(os.path.dirname(profileFile)))
+				sys.exit()
+			if verbose:
+				print('Timing report will be written to {}'.format(profileFile))
+		elif opt == '--watch':
+			watchMode = True
+			if verbose:
+				print('Will keep watching for new or changed png files.')
+		elif opt == '--interval':
+			try:
+				watchInterval = float(arg)
+			except ValueError:
+				watchInterval = 0
+			if watchInterval <= 0:
+				print('Interval must be a number of seconds greater than 0.')
+				sys.exit()
+			if verbose:
+				print('Checking for changes every {} seconds'.format(watchInterval))
+		elif opt == '--recursive':
+			recursiveMode = True
+			if verbose:
+				print('Png files in subfolders will be processed too.')
+		elif opt == '--fit':
+			if arg not in bezeldetect.fitModes:
+				print('Fit must be one of: {}'.format(', '.join(bezeldetect.fitModes)))
+				sys.exit()
+			fitMode = arg
+			if verbose:
+				print('Viewports will be fitted to the {}'.format('bounding box of each transparent area' if fitMode == 'box' else 'largest rectangle inside each transparent area'))
+		elif opt == '--variants':
+			try:
+				variantHeights = bezelvariants.parseHeights(arg)
+			except ValueError:
+				print('Variants must be heights separated by commas, for example 1080,720')
+				sys.exit()
+			if verbose:
+				print('Scaled copies will be written at {}'.format(', '.join(bezelvariants.variantFolders(variantHeights))))
+		elif opt == '--recompress':
+			recompressMode = True
+			if verbose:
+				print('Scaled copies will be compressed harder, without changing any pixels.')
+		elif opt == '--audit':
+			auditMode = True
+			if verbose:
+				print('Existing outputs will be checked, nothing will be written.')
+		elif opt == '--crc':
+			crcMode = True
+			if verbose:
+				print('The png in each zip will be checked against the one next to it byte for byte.')
+		elif opt == '--stream':
+			streamMode = True
+			if verbose:
+				print('Reading png files a row at a time.')
+		elif opt in ['-?', '--help']:
+			print('Available command line options:')
+			print('-?; --help:                   Shows this information')
+			print('-v; --verbose:                Shows additional logging information when running')
+			print('-s; --skip:                   Skip files with existing output')
+			print('-d; --debug:                  Saves alpha mask images of failed bezels to a Debug folder')
+			print('-o; --opacity:                Sets the opacity, must be higher than 0 and no higher than 1')
+			print('								 1 is fully opaque, smaller numbers are more transparent, the default is 0.7')
+			print('-p [folder]; --path [folder]: Set the folder of bezels to process. This can be a subfolder or a full path')
+			print('-u; --ui:							 Use folder selection UI')
+			print('                              If not specified, the default is {}'.format(filePath))
+			print('-j [count]; --jobs [count]:   Number of files to process at the same time, 0 uses all cores. The default is 1')
+			print('-c; --cache:                  Save detection results in {} and reuse them for unchanged files'.format(bezelcache.manifestName))
+			print('-e [list]; --emit [list]:     Outputs to write for each png, any of {} separated by commas'.format(','.join(bezelwriters.outputTypes)))
+			print('                              If not specified, the default is {}'.format(','.join(emit)))
+			print('--pack [file]:                Write all MAME artwork to one zip instead of a zip per png')
+			print('--coarse [scale]:             Find transparent areas on a mask shrunk by scale first ({} works well), then only check those at full size'.format(bezeldetect.coarseScale))
+			print('--verify:                     With --coarse or --stream, also run full size detection and report any differences')
+			print('--stream:                     Read each png a row at a time to keep memory use low on very large bezels (slower)')
+			print('--profile [file]:             Time each stage of each file and save a JSON report to file')
+			print('--watch:                      After processing, keep watching the folder and process png files as they are added or changed')
+			print('--interval [seconds]:         How often --watch checks the folder, the default is {}'.format(bezelwatch.pollInterval))
+			print('--recursive:                  Also process png files in every subfolder, outputs are written next to each png')
+			print('--fit [mode]:                 How the viewport is fitted to the transparent area: box (the default) uses its bounding')
+			print('                              box, inscribed uses the largest rectangle that is transparent all over, for rounded holes')
+			print('--variants [heights]:         Also write scaled copies of each bezel and its outputs at these heights, for example')
+			print('                              1080,720. Each height goes in its own folder next to the png (1080p, 720p)')
+			print('--recompress:                 Compress the scaled copies from --variants as small as possible (lossless, slower)')
+			print('--audit:                      Check the existing outputs against each png without writing anything')
+			print('                              Reports mismatched sizes, viewports outside the image, missing files and stale zips')
+			print('--crc:                        With --audit, also compare each zip\'s png with the one next to it by CRC (reads every png)')
+			sys.exit()
+
+
+	# Keep outputs in a fixed order, the pack takes the place of the zips
+	emit = [output for output in bezelwriters.outputTypes if output in emit]
+	if packFile is not None and 'zip' not in emit:
+		emit.append('zip')
+	if len(emit) == 0:
+		print('No outputs selected.')
+		sys.exit()
+	if auditMode and (watchMode or packFile is not None):
+		print('--audit can not be used with --watch or --pack.')
+		sys.exit()
+	if crcMode and not auditMode:
+		print('--crc can only be used with --audit.')
+		sys.exit()
+	if len(variantHeights) > 0 and packFile is not None:
+		print('--variants can not be used with --pack.')
+		sys.exit()
+	if watchMode and packFile is not None:
+		print('--pack can not be used with --watch, the pack is written once at the end.')
+		sys.exit()
+	if verifyMode and coarseScale == 0 and not streamMode:
+		coarseScale = bezeldetect.coarseScale
+	fastName = 'Streamed' if streamMode else 'Coarse'
+
+	# With --recursive, names are paths from filePath (snes/mario.png) and every folder goes through the same batch
+	# Folders we write into aren't searched, including the variant folders
+	skipFolders = bezelwatch.outputFolders + bezelvariants.variantFolders(variantHeights)
+	rawFileList = [f for f, entry in bezelwatch.scanFolder(filePath, recursiveMode, skipFolders)]
+	fileList = []
+	for f in rawFileList:
+		if f.endswith('.png') and os.path.basename(f) != 'alphaMask.png':
+			fileList.append(f)
+
+	if auditMode:
+		# Only png headers and the existing outputs are read, so this takes seconds even for a whole collection
+		# --crc reads every png with a zip in full as well
+		print('Auditing {} for {}...'.format(filePath, outputList(emit)))
+		auditBezel = functools.partial(bezelaudit.auditBezel, filePath, emit=emit, checkCrc=crcMode)
+		if jobs > 1:
+			with ThreadPoolExecutor(max_workers=jobs) as pool:
+				results = list(pool.map(auditBezel, fileList))
+		else:
+			results = map(auditBezel, fileList)
+		problemCount = 0
+		for f, problems in zip(fileList, results):
+			if len(problems) > 0:
+				problemCount += 1
+				print('{}: {}'.format(f, ', '.join(problems)))
+			elif verbose:
+				print('{}: OK'.format(f))
+		orphans = bezelaudit.orphanOutputs(rawFileList)
+		for name in orphans:
+			print('{}: no matching png'.format(name))
+		print('Audit completed!')
+		print('{} png files checked, {} with problems, {} outputs without a png.'.format(len(fileList), problemCount, len(orphans)))
+		return
+
+	print('Starting Process...')
+	profiler = None
+	if profileFile is not None:
+		profiler = bezelprofile.Profiler(os.path.basename(sys.argv[0]))
+
+	def debugFile(f):
+		# Alpha masks go in a Debug folder next to the png
+		return join(filePath, os.path.dirname(f), 'Debug', os.path.basename(f))
+
+	def outputExists(f):
+		# Like the old scripts, an existing .lay or .zip counts as MAME art already being there
+		# Everything has to go into a pack, so nothing is skipped for it
+		if packFile is not None and 'zip' in emit:
+			return False
+		for output in emit:
+			if output == 'info' and not exists(join(filePath, splitext(f)[0] + '.info')):
+				return False
+			if output in ['lay', 'zip'] and not (exists(join(filePath, splitext(f)[0] + '.lay')) or exists(join(filePath, splitext(f)[0] + '.zip'))):
+				return False
+		return True
+
+	cache = None
+	if cacheMode:
+		cache = bezelcache.BezelCache(filePath)
+	artPack = None
+	if packFile is not None:
+		artPack = bezelwriters.ArtPack(packFile)
+	if profiler is None:
+		detectFile = functools.partial(bezeldetect.detectFile, scale=coarseScale, verify=verifyMode, stream=streamMode, fit=fitMode)
+	else:
+		# Workers send their stage times back with each result
+		detectFile = functools.partial(bezeldetect.detectProfiled, scale=coarseScale, verify=verifyMode, stream=streamMode, fit=fitMode)
+	# The worker pool is started once, in watch mode it stays up between batches
+	executor = None
+	if jobs > 1:
+		executor = ProcessPoolExecutor(max_workers=jobs)
+	# Watching starts before the first batch so files dropped in while it runs are picked up
+	watch = None
+	if watchMode:
+		watch = bezelwatch.FolderWatch(filePath, ['.png'], watchInterval, recursiveMode, skipFolders)
+
+	while True:
+		fileCount = len(fileList)
+		currentFile = 0
+		pngCount = 0
+		bezelCount = 0
+		skipCount = 0
+		mismatchCount = 0
+		errorCount = 0
+		# Folder -> [png files, files written, files skipped] for the --recursive summary
+		folderCounts = {}
+		# (png, worker future or the arguments to run here) for each png that gets scaled copies
+		variantJobs = []
+
+		# Work out what is skipped and what needs detecting before starting the workers
+		# With the cache, unchanged files reuse their saved result and identical files are only detected once
+		# In debug mode every file that could fail is detected, so each one gets its own mask saved
+		pngHashes = {}
+		skipSet = set()
+		detectList = []
+		queuedHashes = set()
+		# png -> the error it couldn't be read with, a file can be gone or broken by the time it is hashed or detected
+		fileErrors = {}
+		for f in fileList:
+			if cache is not None:
+				with bezelprofile.stage(profiler, 'hash', f) as counts:
+					hashedBytes = cache.hashedBytes
+					try:
+						pngHashes[f] = cache.fileHash(f)
+					except OSError as error:
+						fileErrors[f] = error
+					counts['read'] = cache.hashedBytes - hashedBytes
+				if f in fileErrors:
+					continue
+				if fitMode != 'box':
+					# Other fits give other areas for the same png, so they are saved separately
+					pngHashes[f] += ':' + fitMode
+			if skipMode and outputExists(f) and (cache is None or all(cache.isCurrent(f, output) for output in emit)):
+				skipSet.add(f)
+			elif cache is None:
+				detectList.append(f)
+			else:
+				cached = cache.result(pngHashes[f])
+				if (cached is None or (debugMode and len(cached[2]) != 1)) and (debugMode or pngHashes[f] not in queuedHashes):
+					queuedHashes.add(pngHashes[f])
+					detectList.append(f)
+		detectSet = set(detectList)
+
+		# Detection runs in the worker pool, results come back in file order. A file that can't be read comes back as its error
+		detectFiles = [join(filePath, f) for f in detectList]
+		debugFiles = [debugFile(f) if debugMode else None for f in detectList]
+		detectSafe = functools.partial(bezeldetect.detectOrError, detectFile)
+		if executor is not None:
+			results = executor.map(detectSafe, detectFiles, debugFiles)
+		else:
+			results = map(detectSafe, detectFiles, debugFiles)
+
+		for f in fileList:
+			currentFile += 1
+			print('Processing {} (File {}/{})... '.format(textwrap.shorten(f, width=30, placeholder='...').ljust(30), str(currentFile).rjust(4, '0'), str(fileCount).rjust(4, '0')), end='', flush=True)
+			pngCount += 1
+			folderCount = folderCounts.setdefault(os.path.dirname(f), [0, 0, 0])
+			folderCount[0] += 1
+			infoCreated = False
+			skippedFile = False
+			alphaError = False
+			if f in skipSet:
+				skipCount += 1
+				folderCount[2] += 1
+				skippedFile = True
+			else:
+				if f in detectSet:
+					if verbose:
+						print('\nExtracting alpha mask from {}'.format(f))
+					result = next(results)
+					if isinstance(result, bezeldetect.readErrors):
+						fileErrors[f] = result
+					elif profiler is None:
+						bezelWidth, bezelHeight, areas, verified, boxes = result
+					else:
+						(bezelWidth, bezelHeight, areas, verified, boxes), stages = result
+						profiler.addFile(f, stages)
+				if f in fileErrors:
+					areas = []
+				elif f in detectSet:
+					if verified is False:
+						mismatchCount += 1
+						print('\n{} detection did not match full size detection for {}, using the full size result.'.format(fastName, f))
+					if cache is not None:
+						cache.store(pngHashes[f], bezelWidth, bezelHeight, areas, boxes)
+				else:
+					if verbose:
+						print('\nUsing saved result for {}'.format(f))
+					bezelWidth, bezelHeight, areas, boxes = cache.result(pngHashes[f])
+				for areaIndex, (left, top, width, height) in enumerate(areas):
+					if infoCreated:
+						if verbose:
+							print('Multiple transparent areas found, keeping the first one.')
+						if debugMode and verbose:
+							print('Debug copy of alpha mask saved to {}'.format(debugFile(f)))
+						alphaError = True
+					else:
+						if verbose:
+							print('Found transparent area at {} with size {}'.format((left, top), (width, height)))
+						if boxes is not None and (verbose or debugMode):
+							# The bounding box the old fit would have used, to compare
+							boxLeft, boxTop, boxWidth, boxHeight = boxes[areaIndex]
+							print('{}Bounding box is at {} with size {}, the inscribed viewport is {:.1%} of it{}'.format('' if verbose else '\n', (boxLeft, boxTop), (boxWidth, boxHeight), (width * height) / (boxWidth * boxHeight), '' if verbose else '. '), end='\n' if verbose else '')
+						# Outputs go next to the png, which is in a subfolder of filePath with --recursive
+						bezelPath = join(filePath, os.path.dirname(f))
+						setName = splitext(os.path.basename(f))[0]
+						if 'info' in emit:
+							with bezelprofile.stage(profiler, 'write info', f) as counts:
+								bezelwriters.writeInfo(bezelPath, setName, bezelWidth, bezelHeight, (left, top, width, height), opacity)
+								counts['written'] = os.path.getsize(join(bezelPath, setName + '.info'))
+						layText = bezelwriters.layoutText(setName, bezelWidth, bezelHeight, (left, top, width, height))
+						if 'lay' in emit:
+							with bezelprofile.stage(profiler, 'write lay', f) as counts:
+								bezelwriters.writeLayout(bezelPath, setName, layText)
+								counts['written'] = os.path.getsize(join(bezelPath, setName + '.lay'))
+						if 'zip' in emit and artPack is not None:
+							with bezelprofile.stage(profiler, 'add to pack', f, os.path.getsize(join(filePath, f))):
+								packAdded = artPack.add(bezelPath, setName, layText)
+							if not packAdded:
+								print('\n{} is already in the pack from another folder, not added again. '.format(setName), end='')
+						elif 'zip' in emit:
+							with bezelprofile.stage(profiler, 'write zip', f, os.path.getsize(join(filePath, f))) as counts:
+								bezelwriters.writeArtZip(bezelPath, setName, layText)
+								counts['written'] = os.path.getsize(join(bezelPath, setName + '.zip'))
+						if verbose:
+							print('Created {} for image {}'.format(', '.join(setName + '.' + output for output in emit), f))
+						if len(variantHeights) > 0:
+							# Scaling and encoding is the slow part, so with -j it runs in the workers alongside detection
+							variantArgs = (join(filePath, f), setName, bezelWidth, bezelHeight, (left, top, width, height), variantHeights, emit, opacity, recompressMode)
+							if executor is not None:
+								variantJobs.append((f, executor.submit(bezelvariants.writeVariants, *variantArgs)))
+							else:
+								variantJobs.append((f, variantArgs))
+						infoCreated = True
+				if infoCreated and cache is not None:
+					for output in emit:
+						cache.setOutput(f, output)
+				if infoCreated:
+					bezelCount += 1
+					folderCount[1] += 1
+					print('Done! Created {}.'.format(outputList(emit)))
+				elif skippedFile:
+					print('Skipped! {} already exists.'.format(outputList(emit)))
+				elif f in fileErrors:
+					errorCount += 1
+					print('Error! Could not read {}: {}'.format(f, fileErrors[f]))
+				elif alphaError:
+					if debugMode:
+						print('Done with Errors! {} created, but multiple transparent areas found. Alpha mask saved.'.format(outputList(emit)))
+					else:
+						print('Done with Errors! {} created, but multiple transparent areas found.'.format(outputList(emit)))
+				else:
+					print('Error! No {} created, no transparent area detected.'.format(outputList(emit)))
+					if debugMode and verbose:
+						print('Debug copy of alpha mask saved to {}'.format(debugFile(f)))
+
+		if len(variantJobs) > 0:
+			print('Writing scaled copies at {}...'.format(', '.join(bezelvariants.variantFolders(variantHeights))))
+		variantCount = 0
+		variantBytes = 0
+		variantFailed = 0
+		for f, job in variantJobs:
+			try:
+				if executor is not None:
+					heights, written, wall, cpu = job.result()
+				else:
+					heights, written, wall, cpu = bezelvariants.writeVariants(*job)
+			except bezelvariants.variantErrors as error:
+				print('Could not write scaled copies of {}: {}'.format(f, error))
+				variantFailed += 1
+				continue
+			if profiler is not None:
+				profiler.fileTimes(f).add('variants', wall, cpu, os.path.getsize(join(filePath, f)), written)
+			if len(heights) > 0:
+				variantCount += 1
+				variantBytes += written
+			if verbose:
+				if len(heights) > 0:
+					print('Scaled {} to {}'.format(f, ', '.join(bezelvariants.variantFolders(heights))))
+				else:
+					print('{} is already no bigger than the variants, no scaled copies made'.format(f))
+
+		if cache is not None:
+			with bezelprofile.stage(profiler, 'save cache'):
+				cacheSaved = cache.save()
+			if not cacheSaved:
+				print('Could not save {}'.format(cache.fileName))
+		print('Processing completed!')
+		if recursiveMode:
+			for folder in sorted(folderCounts):
+				folderPngs, folderWritten, folderSkipped = folderCounts[folder]
+				print('{}: {} png files, {} written, {} skipped.'.format(join(filePath, folder), folderPngs, folderWritten, folderSkipped))
+		print('{} png files found, {} {} files written, {} files skipped.'.format(pngCount, bezelCount, '/'.join(emit), skipCount))
+		if len(variantJobs) > 0:
+			print('{} files scaled, {:.1f} MB of scaled copies written.'.format(variantCount, variantBytes / (1024 * 1024)))
+			if variantFailed > 0:
+				print('{} files could not be scaled.'.format(variantFailed))
+		if errorCount > 0:
+			print('{} files could not be read.'.format(errorCount))
+		if verifyMode:
+			print('{} detection checked on {} files, {} did not match.'.format(fastName, len(detectList), mismatchCount))
+
+		if watch is None:
+			break
+		print('Watching {} for new or changed png files, press Ctrl+C to stop.'.format(filePath))
+		changed = watch.wait()
+		if changed is None:
+			print('Stopped watching.')
+			break
+		# Files that changed are always redone, whatever their outputs look like
+		fileList = [name for name, oldStat in changed if os.path.basename(name) != 'alphaMask.png']
+		skipMode = False
+		print('{} new or changed png file(s) found.'.format(len(fileList)))
+
+	if executor is not None:
+		executor.shutdown()
+	if artPack is not None:
+		with bezelprofile.stage(profiler, 'close pack') as counts:
+			artPack.close()
+			counts['written'] = os.path.getsize(artPack.fileName)
+		print('MAME artwork saved to {}'.format(artPack.fileName))
+	if profiler is not None:
+		if profiler.save(profileFile):
+			print('Timing report saved to {}'.format(profileFile))
+		else:
+			print('Could not save timing report to {}'.format(profileFile))
+
+if __name__ == "__main__":
+   main(sys.argv[1:])
\ No newline at end of file
@@ -0,0 +1,74 @@
+import os
+import json
+import hashlib
+from os.path import join
+
+# How much of a file is hashed at a time
+hashChunkSize = 1024 * 1024
+
+def hashFile(fileName):
+	# sha1 of a file's contents, read in pieces so a large file is never held at once
+	digest = hashlib.sha1()
+	with open(fileName, 'rb') as hashedFile:
+		for chunk in iter(lambda: hashedFile.read(hashChunkSize), b''):
+			digest.update(chunk)
+	return digest.hexdigest()
+
+def loadJson(fileName, version):
+	# The saved data, or None if there is none, it can't be read, or it was saved with another layout version
+	try:
+		with open(fileName, 'r') as jsonFile:
+			data = json.load(jsonFile)
+	except (OSError, ValueError):
+		return None
+	if not isinstance(data, dict) or data.get('version') != version:
+		return None
+	return data
+
+def saveJson(fileName, data):
+	# Written to a temporary file and moved over the old one, so a crash can't leave half a file. Returns False on errors
+	try:
+		with open(fileName + '.tmp', 'w') as jsonFile:
+			json.dump(data, jsonFile, separators=(',', ':'))
+		os.replace(fileName + '.tmp', fileName)
+	except OSError:
+		return False
+	return True
+
+class FolderManifest:
+	# JSON manifest kept in a bezel folder. files is name -> size, mtime and sha1 of each file hashed, so unchanged files
+	# aren't read again. Subclasses load and save their own data next to it with load and saveData
+	def __init__(self, folder, manifestName, version):
+		self.folder = folder
+		self.fileName = join(folder, manifestName)
+		self.version = version
+		self.files = {}
+		# Bytes read to hash files this run
+		self.hashedBytes = 0
+
+	def load(self, *keys):
+		# The saved value of each of keys, or None if the manifest is missing, unreadable, from another version or doesn't
+		# have them all. files is loaded along with them
+		data = loadJson(self.fileName, self.version)
+		if data is None or any(key not in data for key in ('files',) + keys):
+			return None
+		self.files = data['files']
+		return [data[key] for key in keys]
+
+	def fileHash(self, name):
+		# Only reads the file if its size or mtime changed since it was last hashed, anything else kept for it stays
+		# Raises OSError if the file can't be read
+		fileStat = os.stat(join(self.folder, name))
+		entry = self.files.get(name)
+		if entry is not None and entry['size'] == fileStat.st_size and entry['mtime'] == fileStat.st_mtime_ns:
+			return entry['sha1']
+		sha1 = hashFile(join(self.folder, name))
+		self.hashedBytes += fileStat.st_size
+		self.files[name] = dict(entry or {}, size=fileStat.st_size, mtime=fileStat.st_mtime_ns, sha1=sha1)
+		return sha1
+
+	def saveData(self, **values):
+		# Saves files and the given values, returns False if the manifest couldn't be written
+		data = {'version': self.version, 'files': self.files}
+		data.update(values)
+		return saveJson(self.fileName, data)
@@ -2,10 +2,136 @@ import sys
 import getopt
 import os
 import shutil
+import time
+import json
 import textwrap
-from os.path import isfile, join, splitext, exists
-from xml.dom import minidom
-from itertools import chain
+import hashlib
+import functools
+import mamesets
+import bezelprofile
+import bezelwatch
+import clonemanifest
+from os.path import join, splitext, exists, getsize
+from concurrent.futures import ThreadPoolExecutor
+try:
+	import fcntl
+except ImportError:
+	fcntl = None
+
+linkModes = ['copy', 'hardlink', 'symlink', 'reflink']
+# Linux ioctl to share file extents (btrfs, xfs, etc)
+FICLONE = 0x40049409
+
+def reflinkFile(source, target):
+	if fcntl is None:
+		return False
+	with open(source, 'rb') as sourceFile, open(target, 'wb') as targetFile:
+		try:
+			fcntl.ioctl(targetFile.fileno(), FICLONE, sourceFile.fileno())
+		except OSError:
+			cloned = False
+		else:
+			cloned = True
+	if not cloned:
+		os.remove(target)
+		return False
+	shutil.copystat(source, target)
+	return True
+
+def copyFile(source, target, linkMode):
+	# Copy or link source to target, falling back to a normal copy if the filesystem can't do the requested link
+	# Returns the method that was actually used
+	try:
+		if linkMode == 'hardlink':
+			os.link(source, target)
+			return 'hardlink'
+		elif linkMode == 'symlink':
+			os.symlink(os.path.relpath(source, os.path.dirname(target)), target)
+			return 'symlink'
+		elif linkMode == 'reflink' and reflinkFile(source, target):
+			return 'reflink'
+	except (OSError, NotImplementedError):
+		pass
+	shutil.copy2(source, target)
+	return 'copy'
+
+def runAction(filePath, action, linkMode):
+	# One planned (kind, source, target) action, names are relative to filePath
+	# Returns (method used or the OSError, source size, seconds, CPU seconds), errors are returned so the rest of the plan still runs
+	kind, source, target = action
+	wall = time.perf_counter()
+	cpu = time.thread_time()
+	size = 0
+	try:
+		size = getsize(join(filePath, source))
+		if kind == 'copy':
+			result = copyFile(join(filePath, source), join(filePath, target), linkMode)
+		elif kind == 'replace':
+			# An out of date copy from an earlier run, removed first so links can be made in its place
+			os.remove(join(filePath, target))
+			result = copyFile(join(filePath, source), join(filePath, target), linkMode)
+		elif kind == 'move':
+			os.rename(join(filePath, source), join(filePath, target))
+			result = 'move'
+		else:
+			os.remove(join(filePath, source))
+			result = 'delete'
+	except OSError as error:
+		result = error
+	return result, size, time.perf_counter() - wall, time.thread_time() - cpu
+
+def runPlan(filePath, actions, linkMode, threads):
+	# Results come back in plan order. Copies, links and renames mostly wait on the disk or network, so threads overlap them well
+	# The plan never touches the same file twice and copy sources are never moved or deleted, so the order they finish in doesn't matter
+	if threads <= 1:
+		for action in actions:
+			yield runAction(filePath, action, linkMode)
+		return
+	with ThreadPoolExecutor(max_workers=threads) as pool:
+		yield from pool.map(functools.partial(runAction, filePath, linkMode=linkMode), actions)
+
+def savePlan(fileName, filePath, linkMode, actions):
+	# Returns False if the plan couldn't be written
+	plan = {'path': os.path.abspath(filePath), 'linkMode': linkMode, 'actions': [{'action': kind, 'source': source, 'target': target} for kind, source, target in actions]}
+	try:
+		with open(fileName, 'w') as planData:
+			json.dump(plan, planData, indent=1)
+	except OSError:
+		return False
+	return True
+
+def rollback(filePath, manifest, threads, dryRun, planFile, verbose):
+	# Deletes every copy the manifest says we made, unless it was edited or replaced after we made it
+	print('Checking copies made by earlier runs...                     ', end='', flush=True)
+	actions = [('delete', target, '') for target in manifest.generatedFiles()]
+	print('Done! Found {} copies.'.format(len(actions)))
+	if planFile is not None:
+		if savePlan(planFile, filePath, 'copy', actions):
+			print('Plan saved to {}'.format(planFile))
+		else:
+			print('Could not save plan to {}'.format(planFile))
+	if dryRun:
+		for kind, target, unused in actions:
+			print('delete {} (copy of {})'.format(target, manifest.sourceOf(target)))
+		print('Dry run completed, nothing was changed.')
+		return
+	deletedCount = 0
+	failedCount = 0
+	for (kind, target, unused), (result, size, wall, cpu) in zip(actions, runPlan(filePath, actions, 'copy', threads)):
+		if isinstance(result, OSError):
+			print('Could not delete {}: {}'.format(target, result))
+			failedCount += 1
+			continue
+		manifest.forget(target)
+		deletedCount += 1
+		if verbose:
+			print('{} deleted.'.format(target))
+	if not manifest.save():
+		print('Could not save {}'.format(manifest.fileName))
+	print('Rollback completed!')
+	print('{} copies deleted.'.format(deletedCount))
+	if failedCount > 0:
+		print('{} file actions failed.'.format(failedCount))
 
 def main(argv):
 	# Settings
@@ -14,11 +140,21 @@ def main(argv):
 	verbose = False
 	deleteUnknown = False
 	moveUnknown = False
+	rebuildCache = False
+	linkMode = 'copy'
+	profileFile = None
+	watchMode = False
+	watchInterval = bezelwatch.pollInterval
+	threads = 4
+	dryRun = False
+	planFile = None
+	recursiveMode = False
+	rollbackMode = False
 
 	# Command Line options
-	# v = verbose, m = move unknown, d = delete unknown, p = file path, x = xml file
+	# v = verbose, m = move unknown, d = delete unknown, p = file path, x = xml file, r = rebuild cache, l = link mode, t = threads
 	try:
-		opts, args = getopt.getopt(argv, '?vmdp:x:', ['help', 'verbose', 'move', 'delete', 'path=','xml='])
+		opts, args = getopt.getopt(argv, '?vmdp:x:rl:t:', ['help', 'verbose', 'move', 'delete', 'path=','xml=','rebuild','link-mode=','profile=','watch','interval=','threads=','dry-run','plan=','recursive','rollback'])
 	except getopt.GetoptError:
 		print('Invalid command line option. Use -? or --help to see available options.')
 		sys.exit()
@@ -45,7 +181,9 @@ def main(argv):
 			if verbose:
 				print('File path set to {}'.format(filePath))
 		elif opt in ['-x', '--xml']:
-			if exists(arg):
+			if arg == mamesets.stdinName:
+				xmlFile = arg
+			elif exists(arg):
 				xmlFile = arg
 			elif exists(join(os.getcwd(), arg)):
 				xmlFile = join(os.getcwd(), arg)
@@ -56,6 +194,67 @@ def main(argv):
 				sys.exit()
 			if verbose:
 				print('XML File set to {}'.format(xmlFile))
+		elif opt in ['-r', '--rebuild']:
+			rebuildCache = True
+			if verbose:
+				print('Will rebuild the parent/clone cache')
+		elif opt in ['-l', '--link-mode']:
+			if arg not in linkModes:
+				print('Link mode must be one of: {}'.format(', '.join(linkModes)))
+				sys.exit()
+			linkMode = arg
+			if verbose:
+				print('Link mode set to {}'.format(linkMode))
+		elif opt == '--profile':
+			profileFile = os.path.abspath(arg)
+			if not exists(os.path.dirname(profileFile)):
+				print('Path {} does not exist!'.format(os.path.dirname(profileFile)))
+				sys.exit()
+			if verbose:
+				print('Timing report will be written to {}'.format(profileFile))
+		elif opt == '--watch':
+			watchMode = True
+			if verbose:
+				print('Will keep watching for new or changed files.')
+		elif opt == '--interval':
+			try:
+				watchInterval = float(arg)
+			except ValueError:
+				watchInterval = 0
+			if watchInterval <= 0:
+				print('Interval must be a number of seconds greater than 0.')
+				sys.exit()
+			if verbose:
+				print('Checking for changes every {} seconds'.format(watchInterval))
+		elif opt in ['-t', '--threads']:
+			try:
+				threads = int(arg)
+			except ValueError:
+				threads = 0
+			if threads < 1:
+				print('Threads must be a whole number of at least 1.')
+				sys.exit()
+			if verbose:
+				print('Running file actions with {} thread(s)'.format(threads))
+		elif opt == '--dry-run':
+			dryRun = True
+			if verbose:
+				print('Dry run, no files will be changed')
+		elif opt == '--plan':
+			planFile = os.path.abspath(arg)
+			if not exists(os.path.dirname(planFile)):
+				print('Path {} does not exist!'.format(os.path.dirname(planFile)))
+				sys.exit()
+			if verbose:
+				print('Plan will be saved to {}'.format(planFile))
+		elif opt == '--recursive':
+			recursiveMode = True
+			if verbose:
+				print('Files in subfolders will be processed too')
+		elif opt == '--rollback':
+			rollbackMode = True
+			if verbose:
+				print('Copies made by earlier runs will be removed')
 		elif opt in ['-?', '--help']:
 			print('Available command line options:')
 			print('-?; --help:                   Shows this information.')
@@ -66,154 +265,316 @@ def main(argv):
 			print('-p [folder]; --path [folder]: Set the folder of bezels to process. This can be a subfolder or a full path.')
 			print('                              If not specified, the default is {}'.format(filePath))
 			print('-x [file]; --xml [file]:      Set the MAME XML file to parse. This can be a full path or a file in the current folder.')
+			print('                              It can be compressed (.gz, .xz, .bz2 or .zip), or - to read it from standard input,')
+			print('                              for example: mame -listxml | python mameclonebezels.py -x -')
 			print('                              If not specified, the default is {}'.format(xmlFile))
+			print('-r; --rebuild:                Ignore the saved parent/clone cache and read the XML file again.')
+			print('-l [mode]; --link-mode [mode]: How clone files are made: copy, hardlink, symlink or reflink. The default is copy.')
+			print('                              If the filesystem does not support the link type, a normal copy is made.')
+			print('--profile [file]:             Time reading the XML and each file, and save a JSON report to file.')
+			print('--watch:                      After processing, keep watching the folder. New or changed files are copied to their')
+			print('                              parent/clone family, replacing copies of the old version.')
+			print('--interval [seconds]:         How often --watch checks the folder, the default is {}.'.format(bezelwatch.pollInterval))
+			print('-t [count]; --threads [count]: How many copies, moves and deletes run at the same time. The default is 4.')
+			print('--dry-run:                    Only work out and show what would be copied, moved or deleted, nothing is changed.')
+			print('--plan [file]:                Save the list of copies, moves and deletes to a JSON file.')
+			print('--recursive:                  Also process every subfolder, clones are copied within the folder of their source.')
+			print('--rollback:                   Remove the copies made by earlier runs that have not been changed since, then stop.')
+			print('                              The XML is not needed. Use with --dry-run to see what would be removed.')
 			sys.exit()
+	if dryRun and watchMode:
+		print('--dry-run can not be used with --watch.')
+		sys.exit()
+	if rollbackMode and watchMode:
+		print('--rollback can not be used with --watch.')
+		sys.exit()
 	# Initialize
-	fileList = [f for f in os.listdir(filePath) if isfile(join(filePath, f))]
-	fileCount = len(fileList)
-	unknownPath = join(filePath, 'Unknown')
-	currentFile = 0
-	processedCount = 0
-	skippedCount = 0
-	copyCount = 0
-	copyTotal = 0
-	deletedCount = 0
-	movedCount = 0
-	mameParents = []
-	mameClones = []
+	profiler = None
+	if profileFile is not None:
+		profiler = bezelprofile.Profiler(os.path.basename(sys.argv[0]))
+	# With --recursive, names are paths from filePath (snes/mario.png) and every folder is planned and run together
+	fileList = [f for f, entry in bezelwatch.scanFolder(filePath, recursiveMode)]
+	decorationTypes = ['.png', '.info', '.lay', '.zip']
+	# Watching starts before the first pass so files dropped in while it runs are picked up
+	watch = None
+	if watchMode:
+		watch = bezelwatch.FolderWatch(filePath, decorationTypes, watchInterval, recursiveMode)
+	# Which files are our copies, and of what, so they can be updated or removed later without touching the artist's own files
+	manifest = clonemanifest.CloneManifest(filePath)
+	if rollbackMode:
+		rollback(filePath, manifest, threads, dryRun, planFile, verbose)
+		return
 
 
 	print('Starting Process...')
 	print('Please wait, loading data may take some time.')
 
-	# Load XML
-	print('Loading XML file...                                         ', end='', flush=True)
-	xmlData = minidom.parse(xmlFile)
-	print('Done!')
-
-	# Read XML file, check <machine> tag for name and parent
-	print('Reading parent/clone sets...                                ', end='', flush=True)
-	machineInfo = xmlData.getElementsByTagName('machine')
-	for machine in machineInfo:
-		if 'cloneof' in machine.attributes:
-			# ROM is a clone, store parent & clone name
-			if verbose:
-				if len(mameParents) == 0:
-					print('\n')
-				print('Machine found: {}, clone of {}'.format(machine.attributes['name'].value, machine.attributes['cloneof'].value))
-			machineName = machine.getAttribute('name')
-			machineParent = machine.getAttribute('cloneof')
+	# Use the compiled parent/clone cache if the XML hasn't changed since it was written
+	mameSets = None
+	if not rebuildCache and xmlFile != mamesets.stdinName:
+		print('Loading parent/clone cache...                               ', end='', flush=True)
+		with bezelprofile.stage(profiler, 'load cache') as counts:
+			mameSets = mamesets.loadCache(xmlFile)
+			if mameSets is not None:
+				counts['read'] = getsize(mamesets.cacheFile(xmlFile))
+		if mameSets is not None:
+			print('Done! Loaded {} parent sets and {} clone sets.'.format(mameSets.parentCount(), mameSets.cloneCount()))
 		else:
-			# ROM is a parent, store name as parent only
-			if verbose:
-				if len(mameParents) == 0:
-					print('\n')
-				print('Machine found: {} (Parent Set)'.format(machine.attributes['name'].value))
-			machineParent = machine.getAttribute('name')
-			machineName = ''
-
-		# Add parent if it doesn't exist
-		# Add [parent, clone] if clone and doesn't exist
-		if machineParent not in mameParents:
-			mameParents.append(machineParent)
-		if machineName != '':
-			if [machineParent, machineName] not in mameClones:
-				mameClones.append([machineParent, machineName])
-
-	print('Done! Found {} parent sets and {} clone sets.'.format(len(mameParents), len(mameClones)))
-
-	# Check files against the XML data
-	for f in fileList:
-		currentFile += 1
-		if splitext(f)[1] in ['.png', '.info', '.lay', '.zip']:
-			copyCount = 0
-			deletedFile = False
-			movedFile = False
-			skippedFile = False
-			print('Checking {} (File {}/{})... '.format(textwrap.shorten(f, width=30, placeholder='...').ljust(30), str(currentFile).rjust(4, '0'), str(fileCount).rjust(4, '0')), end='', flush=True)
-			setName = splitext(f)[0]
-			parentSet = setName in mameParents
-			clonesExist = setName in chain(*mameClones)
-			if parentSet and not clonesExist:
-				if verbose:
-					print('\n{} is a parent set with no clones.'.format(setName))
-			elif parentSet and clonesExist:
-				if verbose:
-					print('\n{} is a parent set with clones, checking and copying as needed.'.format(setName))
-				for clone in mameClones:
-					if clone[0] == setName:
-						targetFile = clone[1] + splitext(f)[1]
-						if not exists(join(filePath, targetFile)):
-							shutil.copy2(join(filePath, f), join(filePath, targetFile))
-							if verbose:
-								print('Copied {} to {}'.format(f, targetFile))
-							copyCount += 1
-			elif not parentSet and clonesExist:
+			print('Not found or out of date.')
+
+	if mameSets is None:
+		# Stream the XML file, only the name and parent of each <machine> tag are kept
+		mameSets = mamesets.MameSets()
+		xmlHash = hashlib.sha1()
+		print('Reading parent/clone sets...                                ', end='', flush=True)
+		with bezelprofile.stage(profiler, 'read xml', bytesRead=0 if xmlFile == mamesets.stdinName else getsize(xmlFile)):
+			for machineName, machineParent in mamesets.readMachines(xmlFile, xmlHash):
+				if machineParent != '':
+					# ROM is a clone, store parent & clone name
+					if verbose:
+						if mameSets.parentCount() == 0:
+							print('\n')
+						print('Machine found: {}, clone of {}'.format(machineName, machineParent))
+				else:
+					# ROM is a parent, store name as parent only
+					if verbose:
+						if mameSets.parentCount() == 0:
+							print('\n')
+						print('Machine found: {} (Parent Set)'.format(machineName))
+				mameSets.add(machineName, machineParent)
+
+		print('Done! Found {} parent sets and {} clone sets.'.format(mameSets.parentCount(), mameSets.cloneCount()))
+		# Standard input has no file to keep a cache next to
+		if xmlFile != mamesets.stdinName:
+			with bezelprofile.stage(profiler, 'save cache') as counts:
+				cacheSaved = mamesets.saveCache(xmlFile, mameSets, xmlHash.hexdigest())
+				if cacheSaved:
+					counts['written'] = getsize(mamesets.cacheFile(xmlFile))
+			if cacheSaved:
 				if verbose:
-					print('\n{} is a clone set, checking and copying if parent does not exist.'.format(setName))
-				parentSet = ''
-				for clone in mameClones:
-					if clone[1] == setName:
-						parentSet = clone[0]
-						targetFile = parentSet + splitext(f)[1]
-						if not exists(join(filePath, targetFile)):
-							shutil.copy2(join(filePath, f), join(filePath, targetFile))
-							if verbose:
-								print('Copied {} to {}'.format(f, targetFile))
-							copyCount += 1
-						else:
+					print('Parent/clone cache saved to {}'.format(mamesets.cacheFile(xmlFile)))
+			else:
+				print('Could not save parent/clone cache to {}'.format(mamesets.cacheFile(xmlFile)))
+
+	def familyFiles(f):
+		# f and the file of the same type for every other set in its parent/clone family, in the same folder
+		setName, extension = splitext(os.path.basename(f))
+		parentSet = mameSets.parentOfClone(setName) or setName
+		return [join(os.path.dirname(f), familySet + extension) for familySet in [parentSet] + mameSets.clonesOf(parentSet)]
+
+	def planCopy(source, target):
+		# Adds a copy of source to target to the plan if target is missing, returns 1 if an action was added
+		# Our copies from earlier runs that could be redone count as missing, they are replaced if they are out of date
+		if target in existing:
+			return 0
+		existing.add(target)
+		if target in redoable:
+			kept.add(target)
+			if manifest.isCurrent(target, source):
+				return 0
+			actions.append(('replace', source, target))
+		else:
+			actions.append(('copy', source, target))
+		return 1
+
+	while True:
+		fileCount = len(fileList)
+		currentFile = 0
+		processedCount = 0
+		skippedCount = 0
+		copyCount = 0
+		copyTotal = 0
+		deletedCount = 0
+		movedCount = 0
+		linkCount = 0
+		bytesSaved = 0
+		failedCount = 0
+		# Folder -> [files processed, copies made, files moved, files deleted] for the --recursive summary
+		folderCounts = {}
+
+		# Plan everything against one listing of the folder first. Planned copies, moves and deletes update the listing
+		# as they are planned, so each file sees the same folder it would have if the actions had run one at a time
+		# Each folder is its own set of bezels: clones are only copied within the folder of their source
+		with bezelprofile.stage(profiler, 'list folder'):
+			existing = set(name for name, entry in bezelwatch.scanFolder(filePath, recursiveMode))
+			unknownExisting = set()
+			for folder in set(os.path.dirname(f) for f in fileList):
+				if exists(join(filePath, folder, 'Unknown')):
+					unknownExisting.update(join(folder, 'Unknown', name) for name in os.listdir(join(filePath, folder, 'Unknown')))
+		# Our copies from earlier runs are never used as sources. Those made from a file in this batch, or from one that
+		# is gone, are planned again like missing files, so the ones whose source changed or whose family changed in the
+		# XML are replaced or removed
+		with bezelprofile.stage(profiler, 'check copies'):
+			generated = set(manifest.generatedFiles())
+		batchFiles = set(fileList)
+		redoable = set(target for target in generated if manifest.sourceOf(target) in batchFiles or not exists(join(filePath, manifest.sourceOf(target))))
+		existing -= redoable
+		kept = set()
+		actions = []
+		for f in fileList:
+			currentFile += 1
+			if f in generated:
+				print('Skipping {} - Copy of {} (File {}/{})'.format(textwrap.shorten(f, width=30, placeholder='...').ljust(30), manifest.sourceOf(f), str(currentFile).rjust(4, '0'), str(fileCount).rjust(4, '0')))
+				skippedCount += 1
+			elif splitext(f)[1] in decorationTypes:
+				with bezelprofile.stage(profiler, 'plan', f):
+					copyCount = 0
+					deletedFile = False
+					movedFile = False
+					skippedFile = False
+					print('Checking {} (File {}/{})... '.format(textwrap.shorten(f, width=30, placeholder='...').ljust(30), str(currentFile).rjust(4, '0'), str(fileCount).rjust(4, '0')), end='', flush=True)
+					folder = os.path.dirname(f)
+					setName = splitext(os.path.basename(f))[0]
+					parentSet = mameSets.isParent(setName)
+					clonesExist = mameSets.hasClones(setName)
+					if parentSet and not clonesExist:
+						if verbose:
+							print('\n{} is a parent set with no clones.'.format(setName))
+					elif parentSet and clonesExist:
+						if verbose:
+							print('\n{} is a parent set with clones, checking and copying as needed.'.format(setName))
+						for clone in mameSets.clonesOf(setName):
+							copyCount += planCopy(f, join(folder, clone + splitext(f)[1]))
+					elif not parentSet and clonesExist:
+						if verbose:
+							print('\n{} is a clone set, checking and copying if parent does not exist.'.format(setName))
+						parentSet = mameSets.parentOfClone(setName)
+						targetFile = join(folder, parentSet + splitext(f)[1])
+						if targetFile in existing:
 							# If there IS a parent set bezel, assume we want to use that for any missing clones and not this one.
 							parentSet = ''
-				if parentSet != '':
-					for clone in mameClones:
-						if clone[0] == parentSet:
-							targetFile = clone[1] + splitext(f)[1]
-							if not exists(join(filePath, targetFile)):
-								shutil.copy2(join(filePath, f), join(filePath, targetFile))
+						else:
+							copyCount += planCopy(f, targetFile)
+						if parentSet != '':
+							for clone in mameSets.clonesOf(parentSet):
+								copyCount += planCopy(f, join(folder, clone + splitext(f)[1]))
+					elif not parentSet and not clonesExist:
+						if verbose:
+							print('\n{} does not match any known sets.'.format(setName))
+						if deleteUnknown:
+							actions.append(('delete', f, ''))
+							existing.discard(f)
+							deletedFile = True
+						elif moveUnknown:
+							unknownFile = join(folder, 'Unknown', os.path.basename(f))
+							if unknownFile not in unknownExisting:
+								actions.append(('move', f, unknownFile))
+								existing.discard(f)
+								unknownExisting.add(unknownFile)
+								movedFile = True
+							else:
 								if verbose:
-									print('Copied {} to {}'.format(f, targetFile))
-								copyCount += 1
-			elif not parentSet and not clonesExist:
+									print('File exists in backup path, not moved.')
+								skippedFile = True
+								skippedCount += 1
+								processedCount -= 1
+				processedCount += 1
+				if not skippedFile:
+					folderCounts.setdefault(os.path.dirname(f), [0, 0, 0, 0])[0] += 1
+				if copyCount > 0:
+					print('Done! {} copy/copies to make.'.format(copyCount))
+				elif movedFile:
+					print('Done! No match, will be moved to Unknown folder.')
+				elif deletedFile:
+					print('Done! No match, will be deleted.')
+				elif skippedFile:
+					print('Done! No match, already exists in Unknown, no actions taken.')
+				else:
+					print('Done! No actions taken.')
+			else:
+				print('Skipping {} - Not a decoration (File {}/{})'.format(textwrap.shorten(f, width=30, placeholder='...').ljust(30), str(currentFile).rjust(4, '0'), str(fileCount).rjust(4, '0')))
+				skippedCount += 1
+
+		# Our copies that nothing was planned into any more: their source is gone, or the XML moved them out of its family
+		staleCount = 0
+		for target in sorted(redoable - kept):
+			actions.append(('delete', target, ''))
+			staleCount += 1
+			if verbose:
+				print('{} is no longer needed as a copy of {}, will be deleted.'.format(target, manifest.sourceOf(target)))
+		if staleCount > 0:
+			print('{} copies from earlier runs are no longer needed and will be deleted.'.format(staleCount))
+
+		if planFile is not None:
+			if savePlan(planFile, filePath, linkMode, actions):
+				print('Plan saved to {}'.format(planFile))
+			else:
+				print('Could not save plan to {}'.format(planFile))
+		if dryRun:
+			for kind, source, target in actions:
+				print('{} {}{}'.format(kind.ljust(6), source, ' -> ' + target if target != '' else ''))
+			print('Dry run completed, nothing was changed.')
+			print('{} files processed, {} copies, {} moves and {} deletes planned, {} files skipped.'.format(processedCount, sum(1 for action in actions if action[0] in ['copy', 'replace']), sum(1 for action in actions if action[0] == 'move'), sum(1 for action in actions if action[0] == 'delete'), skippedCount))
+			break
+
+		# Run the plan, results come back in plan order
+		for unknownFolder in set(os.path.dirname(target) for kind, source, target in actions if kind == 'move'):
+			os.makedirs(join(filePath, unknownFolder), exist_ok=True)
+		if len(actions) > 0:
+			print('Running {} file actions with {} thread(s)...'.format(len(actions), threads))
+		for (kind, source, target), (result, size, wall, cpu) in zip(actions, runPlan(filePath, actions, linkMode, threads)):
+			if isinstance(result, OSError):
+				print('Could not {} {}: {}'.format(kind, source, result))
+				failedCount += 1
+				continue
+			folderCount = folderCounts.setdefault(os.path.dirname(source), [0, 0, 0, 0])
+			if profiler is not None:
+				copied = size if result == 'copy' else 0
+				profiler.fileTimes(source).add(kind, wall, cpu, copied, copied)
+			if kind in ['copy', 'replace']:
+				manifest.record(target, source)
+				copyTotal += 1
+				folderCount[1] += 1
+				if result != 'copy':
+					linkCount += 1
+					bytesSaved += size
+				if verbose and kind == 'replace':
+					print('Replaced {} with a new copy of {} ({})'.format(target, source, result))
+				elif verbose:
+					print('Copied {} to {} ({})'.format(source, target, result))
+			elif kind == 'move':
+				movedCount += 1
+				folderCount[2] += 1
 				if verbose:
-					print('\n{} does not match any known sets.'.format(setName))
-				if deleteUnknown:
-					os.remove(join(filePath, f))
-					if verbose:
-						print("File deleted.")
-					deletedFile = True
-					deletedCount += 1
-				elif moveUnknown:
-					if not exists(unknownPath):
-						os.makedirs(unknownPath)
-					if not exists(join(unknownPath, f)):
-						os.rename(join(filePath, f), join(unknownPath, f))
-						if verbose:
-							print("File moved to {}".format(join(unknownPath, f)))
-						movedFile = True
-						movedCount += 1
-					else:
-						if verbose:
-							print('File exists in backup path, not moved.')
-						skippedFile = True
-						skippedCount += 1
-						processedCount -= 1
-			processedCount += 1
-			if copyCount > 0:
-				print('Done! {} copy/copies made.'.format(copyCount))
-				copyTotal += copyCount
-			elif movedFile:
-				print('Done! No match, moved to Unknown folder.')
-			elif deletedFile:
-				print('Done! No match, deleted.')
-			elif skippedFile:
-				print('Done! No match, already exists in Unknown, no actions taken.')
+					print('{} moved to {}'.format(source, join(filePath, target)))
 			else:
-				print('Done! No actions taken.')
+				manifest.forget(source)
+				deletedCount += 1
+				folderCount[3] += 1
+				if verbose:
+					print('{} deleted.'.format(source))
+		with bezelprofile.stage(profiler, 'save manifest'):
+			manifestSaved = manifest.save()
+		if not manifestSaved:
+			print('Could not save {}'.format(manifest.fileName))
+		print('Processing completed!')
+		if recursiveMode:
+			for folder in sorted(folderCounts):
+				print('{}: {} files processed, {} copies made, {} files moved, {} files deleted.'.format(join(filePath, folder), *folderCounts[folder]))
+		print('{} files processed, {} copies made, {} files moved, {} files deleted, {} files skipped.'.format(processedCount, copyTotal, movedCount, deletedCount, skippedCount))
+		if linkMode != 'copy':
+			print('{} of {} copies linked with {}, {:.1f} MB saved.'.format(linkCount, copyTotal, linkMode, bytesSaved / (1024 * 1024)))
+		if failedCount > 0:
+			print('{} file actions failed.'.format(failedCount))
+
+		if watch is None:
+			break
+		# Our own copies, moves and deletes aren't new work
+		watch.refresh(name for f in fileList for name in familyFiles(f))
+		print('Watching {} for new or changed files, press Ctrl+C to stop.'.format(filePath))
+		changed = watch.wait()
+		if changed is None:
+			print('Stopped watching.')
+			break
+		# Only the families of changed files are looked at again, the plan replaces copies that were made from them
+		fileList = [f for f, oldStat in changed]
+		print('{} new or changed file(s) found.'.format(len(fileList)))
+
+	if profiler is not None:
+		if profiler.save(profileFile):
+			print('Timing report saved to {}'.format(profileFile))
 		else:
-			print('Skipping {} - Not a decoration (File {}/{})'.format(textwrap.shorten(f, width=30, placeholder='...').ljust(30), str(currentFile).rjust(4, '0'), str(fileCount).rjust(4, '0')))
-			skippedCount += 1
-	print('Processing completed!')
-	print('{} files processed, {} copies made, {} files moved, {} files deleted, {} files skipped.'.format(processedCount, copyTotal, movedCount, deletedCount, skippedCount))
+			print('Could not save timing report to {}'.format(profileFile))
 
 if __name__ == "__main__":
    main(sys.argv[1:])
\ No newline at end of file
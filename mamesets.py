@@ -0,0 +1,169 @@
+import os
+import sys
+import bz2
+import gzip
+import lzma
+import zipfile
+from xml.parsers import expat
+import jsonmanifest
+
+# How much of the XML is read and parsed at a time
+chunkSize = 1024 * 1024
+# Bump when the layout of the cache file changes
+cacheVersion = 1
+# XML file name that means read it from standard input, e.g. mame -listxml | python mameclonebezels.py -x -
+stdinName = '-'
+# Compressed XML files are read through these as they are decompressed, zips are handled separately
+compressedTypes = {'.gz': gzip.GzipFile, '.xz': lzma.LZMAFile, '.bz2': bz2.BZ2File}
+
+class HashedReader:
+	# Passes reads through to a file, adding what was read to a hashlib object
+	# Used so a compressed XML is hashed as it is on disk while it is being decompressed
+	def __init__(self, rawFile, digest):
+		self.rawFile = rawFile
+		self.digest = digest
+
+	def read(self, size=-1):
+		data = self.rawFile.read(size)
+		self.digest.update(data)
+		return data
+
+	def readable(self):
+		return True
+
+	def close(self):
+		self.rawFile.close()
+
+def isZip(xmlFile):
+	return xmlFile != stdinName and os.path.splitext(xmlFile)[1].lower() == '.zip'
+
+def openXml(xmlFile, digest=None):
+	# Binary file object of the XML: plain, compressed (.gz, .xz, .bz2, or the .xml in a .zip), or standard input
+	# Compressed files are decompressed as they are read, nothing is unpacked to disk
+	# digest is updated with the file as it is on disk, except for zips (they need seeking, see readMachines)
+	if xmlFile == stdinName:
+		return sys.stdin.buffer
+	if isZip(xmlFile):
+		with zipfile.ZipFile(xmlFile) as archive:
+			names = [name for name in archive.namelist() if not name.endswith('/')]
+			xmlNames = [name for name in names if name.lower().endswith('.xml')]
+			if len(names) == 0:
+				raise ValueError('{} is empty'.format(xmlFile))
+			# The member keeps the zip open until it is closed
+			return archive.open((xmlNames or names)[0])
+	rawFile = open(xmlFile, 'rb')
+	if digest is not None:
+		rawFile = HashedReader(rawFile, digest)
+	decompressor = compressedTypes.get(os.path.splitext(xmlFile)[1].lower())
+	if decompressor is None:
+		return rawFile
+	return decompressor(fileobj=rawFile) if decompressor is gzip.GzipFile else decompressor(rawFile)
+
+def readMachines(xmlFile, digest=None):
+	# Streams (name, cloneof) for each <machine> in a mame -listxml file, cloneof is '' for parent sets
+	# Only those two attributes are kept, nothing else in the file is stored, so memory use doesn't grow with the XML
+	# If a hashlib object is passed as digest, it is updated with the file contents as they are read
+	# xmlFile can be compressed or standard input, see openXml
+	machines = []
+
+	def startElement(name, attributes):
+		if name == 'machine':
+			machines.append((attributes.get('name', ''), attributes.get('cloneof', '')))
+
+	parser = expat.ParserCreate()
+	parser.StartElementHandler = startElement
+	xmlData = openXml(xmlFile, digest)
+	try:
+		while True:
+			chunk = xmlData.read(chunkSize)
+			parser.Parse(chunk, not chunk)
+			yield from machines
+			machines.clear()
+			if not chunk:
+				break
+	finally:
+		if xmlFile != stdinName:
+			xmlData.close()
+	if digest is not None and isZip(xmlFile):
+		with open(xmlFile, 'rb') as zipData:
+			for chunk in iter(lambda: zipData.read(chunkSize), b''):
+				digest.update(chunk)
+
+class MameSets:
+	# Parent/clone index, every lookup is a set or dict lookup so it costs the same however many machines MAME has
+	def __init__(self):
+		self.parents = set()
+		# parent -> clones in XML order, clone -> parent
+		self.clones = {}
+		self.parentOf = {}
+
+	def add(self, machineName, machineParent=''):
+		# A parent set only needs its name, a clone also records its parent
+		if machineParent == '':
+			self.parents.add(machineName)
+		elif machineName not in self.parentOf:
+			self.parents.add(machineParent)
+			self.parentOf[machineName] = machineParent
+			self.clones.setdefault(machineParent, []).append(machineName)
+
+	def isParent(self, setName):
+		return setName in self.parents
+
+	def hasClones(self, setName):
+		# True for a parent with at least one clone, or for a clone
+		return setName in self.clones or setName in self.parentOf
+
+	def clonesOf(self, setName):
+		return self.clones.get(setName, [])
+
+	def parentOfClone(self, setName):
+		return self.parentOf.get(setName, '')
+
+	def parentCount(self):
+		return len(self.parents)
+
+	def cloneCount(self):
+		return len(self.parentOf)
+
+	def toDict(self):
+		return {'parents': sorted(self.parents), 'clones': self.clones}
+
+	@classmethod
+	def fromDict(cls, data):
+		mameSets = cls()
+		mameSets.parents = set(data['parents'])
+		mameSets.clones = data['clones']
+		for parent, clones in mameSets.clones.items():
+			for clone in clones:
+				mameSets.parentOf[clone] = parent
+		return mameSets
+
+def cacheFile(xmlFile):
+	# The compiled parent/clone data lives next to the XML it came from, there is none for standard input
+	return xmlFile + '.cache'
+
+def loadCache(xmlFile):
+	# Returns the cached MameSets if the XML hasn't changed since the cache was written, otherwise None
+	# Size and mtime are checked first, the file is only hashed if the mtime moved (e.g. the XML was copied or touched)
+	data = jsonmanifest.loadJson(cacheFile(xmlFile), cacheVersion)
+	if data is None:
+		return None
+	try:
+		xmlStat = os.stat(xmlFile)
+	except OSError:
+		return None
+	if data.get('size') != xmlStat.st_size:
+		return None
+	mameSets = MameSets.fromDict(data)
+	if data.get('mtime') != xmlStat.st_mtime_ns:
+		if jsonmanifest.hashFile(xmlFile) != data.get('sha1'):
+			return None
+		saveCache(xmlFile, mameSets, data['sha1'])
+	return mameSets
+
+def saveCache(xmlFile, mameSets, sha1):
+	# Returns False if the cache couldn't be written, the sets are still usable
+	xmlStat = os.stat(xmlFile)
+	data = {'version': cacheVersion, 'size': xmlStat.st_size, 'mtime': xmlStat.st_mtime_ns, 'sha1': sha1}
+	data.update(mameSets.toDict())
+	return jsonmanifest.saveJson(cacheFile(xmlFile), data)
@@ -0,0 +1,327 @@
+import io
+import zlib
+import struct
+import numpy
+
+pngSignature = b'\x89PNG\r\n\x1a\n'
+# Samples per pixel for each png colour type
+channelCounts = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}
+# Most compressed data read from the file at a time
+pieceSize = 64 * 1024
+
+class UnsupportedPng(ValueError):
+	# Valid png that the row reader can't handle (interlaced), the caller should decode it the normal way
+	pass
+
+def openPng(source):
+	# source is a file name, or the png itself as bytes
+	if isinstance(source, (bytes, bytearray, memoryview)):
+		return io.BytesIO(source)
+	return open(source, 'rb')
+
+def readChunks(pngFile):
+	# Yields (chunk type, data), IDAT data comes in pieces so a huge IDAT chunk is never held at once
+	if pngFile.read(8) != pngSignature:
+		raise ValueError('Not a png file')
+	while True:
+		header = pngFile.read(8)
+		if len(header) < 8:
+			return
+		length, chunkType = struct.unpack('>I4s', header)
+		if chunkType == b'IDAT':
+			while length > 0:
+				piece = pngFile.read(min(length, pieceSize))
+				if not piece:
+					raise ValueError('Truncated png file')
+				length -= len(piece)
+				yield chunkType, piece
+		else:
+			yield chunkType, pngFile.read(length)
+		pngFile.read(4)
+		if chunkType == b'IEND':
+			return
+
+def readHeader(fileName):
+	# (width, height, bit depth, colour type, interlace) from IHDR, nothing else in the file is read
+	with openPng(fileName) as pngFile:
+		if pngFile.read(8) != pngSignature:
+			raise ValueError('Not a png file')
+		length, chunkType = struct.unpack('>I4s', pngFile.read(8))
+		if chunkType != b'IHDR' or length < 13:
+			raise ValueError('png file has no header')
+		width, height, bitDepth, colorType, compression, filterMethod, interlace = struct.unpack('>IIBBBBB', pngFile.read(13))
+	return width, height, bitDepth, colorType, interlace
+
+def averageColumn(samples, prior, left=0):
+	result = [0] * len(samples)
+	for i in range(len(samples)):
+		left = (samples[i] + ((left + prior[i]) >> 1)) & 255
+		result[i] = left
+	return result
+
+def paethColumn(samples, prior, left=0, upLeft=0):
+	result = [0] * len(samples)
+	for i in range(len(samples)):
+		up = prior[i]
+		leftDistance = abs(up - upLeft)
+		upDistance = abs(left - upLeft)
+		upLeftDistance = abs(left + up - 2 * upLeft)
+		if leftDistance <= upDistance and leftDistance <= upLeftDistance:
+			predicted = left
+		elif upDistance <= upLeftDistance:
+			predicted = up
+		else:
+			predicted = upLeft
+		left = (samples[i] + predicted) & 255
+		result[i] = left
+		upLeft = up
+	return result
+
+# Average and Paeth depend on the pixel to the left, so a row is solved as a whole and corrected until it stops changing
+# Rounds allowed before the rest of a row is finished a pixel at a time, real bezels settle in two or three
+solveRounds = 8
+
+def leftOf(values):
+	# Each pixel's left neighbour, 0 for the first pixel as in the png spec
+	shifted = numpy.zeros_like(values)
+	shifted[1:] = values[:-1]
+	return shifted
+
+def firstChanges(old, new):
+	# Index of the first pixel that differs in each byte column, None for columns that match
+	changed = old != new
+	return [int(numpy.argmax(changed[:, column])) if changed[:, column].any() else None for column in range(old.shape[1])]
+
+def averageRow(samples, prior):
+	# Each round fixes at least one more pixel, and a wrong left value's effect halves with each pixel, so it settles fast
+	up = prior.astype(numpy.uint16)
+	result = prior
+	for solveRound in range(solveRounds):
+		previous = result
+		result = samples + ((leftOf(previous).astype(numpy.uint16) + up) >> 1).astype(numpy.uint8)
+		if numpy.array_equal(result, previous):
+			return result
+	# Everything up to the first pixel that changed in the last round is right, the rest is finished one pixel at a time
+	for column, first in enumerate(firstChanges(previous, result)):
+		if first is not None:
+			result[first + 1:, column] = averageColumn(samples[first + 1:, column].tolist(), prior[first + 1:, column].tolist(), int(result[first, column]))
+	return result
+
+def paethChoices(left, up, upLeft):
+	# Which neighbour the Paeth predictor picks for each pixel: 0 left, 1 up, 2 up left. All int16
+	leftDistance = numpy.abs(up - upLeft)
+	upDistance = numpy.abs(left - upLeft)
+	upLeftDistance = numpy.abs(left + up - 2 * upLeft)
+	return numpy.where((leftDistance <= upDistance) & (leftDistance <= upLeftDistance), 0, numpy.where(upDistance <= upLeftDistance, 1, 2))
+
+def paethSolve(samples, prior, priorLeft, choices):
+	# The row for a given set of choices: pixels predicted from the row above are known outright, and a run predicted from
+	# the left is a running sum from the pixel before it, so the whole row is one cumulative sum
+	sums = numpy.cumsum(samples + numpy.where(choices == 1, prior, numpy.where(choices == 2, priorLeft, 0)).astype(numpy.uint8), axis=0, dtype=numpy.uint8)
+	index = numpy.arange(len(samples))[:, numpy.newaxis]
+	# Each pixel's run starts after the last pixel at or before it that isn't predicted from the left
+	starts = numpy.maximum.accumulate(numpy.where(choices != 0, index, 0), axis=0)
+	before = numpy.where(starts > 0, numpy.take_along_axis(sums, numpy.maximum(starts - 1, 0), axis=0), 0)
+	return sums - before.astype(numpy.uint8)
+
+def paethRow(samples, prior):
+	# The choices are first guessed from the row above, which matches the row for most of a bezel
+	up = prior.astype(numpy.int16)
+	upLeft = leftOf(up)
+	priorLeft = leftOf(prior)
+	choices = paethChoices(upLeft, up, upLeft)
+	for solveRound in range(solveRounds):
+		result = paethSolve(samples, prior, priorLeft, choices)
+		previous = choices
+		choices = paethChoices(leftOf(result.astype(numpy.int16)), up, upLeft)
+		if numpy.array_equal(choices, previous):
+			return result
+	# Pixels before the first choice that changed were solved with the right choices, the rest is finished one pixel at a time
+	for column, first in enumerate(firstChanges(previous, choices)):
+		if first is not None:
+			left = int(result[first - 1, column]) if first > 0 else 0
+			result[first:, column] = paethColumn(samples[first:, column].tolist(), up[first:, column].tolist(), left, int(upLeft[first, column]))
+	return result
+
+def unfilter(filterType, samples, prior):
+	# samples and prior are (pixels, bytes) arrays, each byte column only depends on itself so unused ones can be left out
+	if filterType == 0:
+		return samples.copy()
+	if filterType == 1:
+		return numpy.cumsum(samples, axis=0, dtype=numpy.uint8)
+	if filterType == 2:
+		return samples + prior
+	if filterType == 3:
+		return averageRow(samples, prior)
+	if filterType == 4:
+		return paethRow(samples, prior)
+	raise ValueError('Bad png filter type {}'.format(filterType))
+
+def unpackSamples(packed, bitDepth, width):
+	# 1, 2 and 4 bit samples packed into bytes, first sample in the high bits
+	shifts = numpy.arange(8 - bitDepth, -1, -bitDepth, dtype=numpy.uint8)
+	return ((packed[:, numpy.newaxis] >> shifts) & ((1 << bitDepth) - 1)).ravel()[:width]
+
+class AlphaRowDecoder:
+	# Turns decompressed IDAT data into alpha rows, only the byte columns needed for alpha are unfiltered and kept
+	def __init__(self, width, height, bitDepth, colorType, paletteAlpha=None, transparent=None):
+		self.width = width
+		self.height = height
+		self.bitDepth = bitDepth
+		self.colorType = colorType
+		self.paletteAlpha = paletteAlpha
+		self.transparent = transparent
+		channels = channelCounts[colorType]
+		sampleBytes = max(1, bitDepth // 8)
+		self.rowBytes = (width * channels * bitDepth + 7) // 8
+		# Filters work on whole bytes, a pixel of less than a byte counts as one
+		self.pixelBytes = max(1, channels * bitDepth // 8)
+		if colorType in (4, 6):
+			self.columns = list(range((channels - 1) * sampleBytes, channels * sampleBytes))
+		else:
+			self.columns = list(range(self.pixelBytes))
+		self.previous = numpy.zeros((self.rowBytes // self.pixelBytes, len(self.columns)), dtype=numpy.uint8)
+		self.decompressor = zlib.decompressobj()
+		self.pending = bytearray()
+		self.row = 0
+
+	def alpha(self, current):
+		if self.colorType in (4, 6):
+			if self.bitDepth == 16:
+				return ((current[:, 0].astype(numpy.uint32) * 256 + current[:, 1] + 128) // 257).astype(numpy.uint8)
+			return current[:, 0].copy()
+		if self.bitDepth < 8:
+			samples = unpackSamples(current[:, 0], self.bitDepth, self.width)
+		elif self.bitDepth == 16:
+			samples = current.reshape(self.width, -1, 2).astype(numpy.uint32)
+			samples = samples[:, :, 0] * 256 + samples[:, :, 1]
+		else:
+			samples = current.reshape(self.width, -1)
+		if self.colorType == 3:
+			return self.paletteAlpha[samples.reshape(self.width)]
+		# Grey or RGB with a tRNS colour: only pixels of exactly that colour are transparent
+		samples = samples.reshape(self.width, -1)
+		return numpy.where((samples == numpy.array(self.transparent[:samples.shape[1]])).all(axis=1), 0, 255).astype(numpy.uint8)
+
+	def feed(self, data):
+		# Yields every alpha row completed by this piece of IDAT data, output is limited so a highly compressed image can't balloon
+		while True:
+			unpacked = self.decompressor.decompress(data, 4 * (self.rowBytes + 1))
+			data = self.decompressor.unconsumed_tail
+			self.pending += unpacked
+			while len(self.pending) > self.rowBytes and self.row < self.height:
+				filterType = self.pending[0]
+				samples = numpy.frombuffer(bytes(self.pending[1:self.rowBytes + 1]), dtype=numpy.uint8)
+				del self.pending[:self.rowBytes + 1]
+				samples = samples.reshape(-1, self.pixelBytes)[:, self.columns]
+				self.previous = unfilter(filterType, samples, self.previous)
+				self.row += 1
+				yield self.alpha(self.previous)
+			if not data and not unpacked:
+				return
+
+def alphaRows(fileName):
+	# Yields the 8 bit alpha of each row, top to bottom, as a numpy array
+	# Only the current and previous rows are kept, so memory use doesn't depend on the image height
+	with openPng(fileName) as pngFile:
+		header = None
+		paletteAlpha = None
+		transparent = None
+		decoder = None
+		for chunkType, data in readChunks(pngFile):
+			if chunkType == b'IHDR':
+				header = struct.unpack('>IIBBBBB', data[:13])
+				if header[6] != 0:
+					raise UnsupportedPng('Interlaced png files are not supported')
+			elif chunkType == b'tRNS' and header is not None:
+				if header[3] == 3:
+					paletteAlpha = numpy.full(256, 255, dtype=numpy.uint8)
+					paletteAlpha[:len(data)] = numpy.frombuffer(data[:256], dtype=numpy.uint8)
+				else:
+					transparent = struct.unpack('>' + 'H' * (len(data) // 2), data)
+			elif chunkType == b'IDAT':
+				if header is None:
+					raise ValueError('png file has no header')
+				width, height, bitDepth, colorType = header[:4]
+				if decoder is None:
+					if colorType not in (4, 6) and paletteAlpha is None and transparent is None:
+						# No alpha at all, no need to decompress anything
+						for row in range(height):
+							yield numpy.full(width, 255, dtype=numpy.uint8)
+						return
+					decoder = AlphaRowDecoder(width, height, bitDepth, colorType, paletteAlpha, transparent)
+				yield from decoder.feed(data)
+		if decoder is None or decoder.row < decoder.height:
+			raise ValueError('Truncated png file')
+
+# Filters PngWriter can use by name, adaptive picks the one that packs best for each row like libpng and ImageMagick do
+filterTypes = {'none': 0, 'sub': 1, 'up': 2, 'average': 3, 'paeth': 4, 'adaptive': None}
+
+def filterRow(filterType, row, prior, pixelBytes):
+	# The opposite of unfilter, for a whole row of bytes: nothing depends on an earlier result so it's all one step
+	current = row.astype(numpy.int16)
+	up = prior.astype(numpy.int16)
+	left = numpy.zeros_like(current)
+	left[pixelBytes:] = current[:-pixelBytes]
+	if filterType == 0:
+		return row
+	if filterType == 1:
+		predicted = left
+	elif filterType == 2:
+		predicted = up
+	elif filterType == 3:
+		predicted = (left + up) >> 1
+	else:
+		upLeft = numpy.zeros_like(up)
+		upLeft[pixelBytes:] = up[:-pixelBytes]
+		predicted = numpy.choose(paethChoices(left, up, upLeft), [left, up, upLeft])
+	return ((current - predicted) & 255).astype(numpy.uint8)
+
+def adaptiveFilter(row, prior, pixelBytes):
+	# (filter type, filtered row) with the smallest sum of bytes taken as signed, the usual libpng heuristic
+	candidates = [(filterType, filterRow(filterType, row, prior, pixelBytes)) for filterType in range(5)]
+	return min(candidates, key=lambda candidate: int(numpy.abs(candidate[1].view(numpy.int8).astype(numpy.int32)).sum()))
+
+class PngWriter:
+	# Writes a png a row at a time: 8 bit grey (colour type 0), 8 bit RGBA (6), or 1 bit grey for masks
+	# Rows are written unfiltered unless another filter type from filterTypes is given
+	def __init__(self, fileName, width, height, colorType=0, bitDepth=8, level=6, filterType='none'):
+		self.pngFile = open(fileName, 'wb')
+		self.compressor = zlib.compressobj(level)
+		self.buffer = bytearray()
+		self.filterType = filterTypes[filterType]
+		self.pixelBytes = max(1, channelCounts[colorType] * bitDepth // 8)
+		self.prior = numpy.zeros((width * channelCounts[colorType] * bitDepth + 7) // 8, dtype=numpy.uint8)
+		self.pngFile.write(pngSignature)
+		self.writeChunk(b'IHDR', struct.pack('>IIBBBBB', width, height, bitDepth, colorType, 0, 0, 0))
+
+	def writeChunk(self, chunkType, data):
+		self.pngFile.write(struct.pack('>I', len(data)) + chunkType + data + struct.pack('>I', zlib.crc32(chunkType + data) & 0xffffffff))
+
+	def writeRow(self, row):
+		# row is the raw bytes of one row, packed the same way as in the file
+		if self.filterType == 0:
+			self.buffer += self.compressor.compress(b'\x00' + bytes(row))
+		else:
+			row = numpy.frombuffer(bytes(row), dtype=numpy.uint8)
+			if self.filterType is None:
+				filterType, filtered = adaptiveFilter(row, self.prior, self.pixelBytes)
+			else:
+				filterType, filtered = self.filterType, filterRow(self.filterType, row, self.prior, self.pixelBytes)
+			self.buffer += self.compressor.compress(bytes([filterType]) + filtered.tobytes())
+			self.prior = row
+		if len(self.buffer) >= pieceSize:
+			self.writeChunk(b'IDAT', bytes(self.buffer))
+			self.buffer = bytearray()
+
+	def close(self):
+		self.buffer += self.compressor.flush()
+		self.writeChunk(b'IDAT', bytes(self.buffer))
+		self.writeChunk(b'IEND', b'')
+		self.pngFile.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exception):
+		self.close()